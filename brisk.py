@@ -1,14 +1,14 @@
 #!/usr/bin/env python3
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 import string
 import logging
 from math import ceil
 from random import choice
-import json
 import asyncpg
 from discord_slash.client import SlashCommand
 from cogs import utils
@@ -30,12 +30,47 @@ async def get_prefix(bot, message):
     """Returns the prefix of a corresponding guild."""
     if message.guild is None:
         return commands.when_mentioned_or(commandprefix)(bot, message)
-    prefix = await bot.fetchval("SELECT prefix FROM prefixes WHERE server_id = $1", message.guild.id)
+    prefix = await bot.get_guild_prefix(message.guild.id)
     if prefix is None:
         return commands.when_mentioned_or(commandprefix)(bot, message)
     return commands.when_mentioned_or(prefix)(bot, message)
 
 
+class BriskConnection(asyncpg.Connection):
+    """Database connection holding the statements prepared for the queries of `utils.Queries`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = {} # Query -> prepared statement
+
+
+class UnitOfWork:
+    """Transaction opened by `Bot.unit_of_work`, holding the balance changes to apply once it is committed.
+    State is kept here rather than on the connection, which is a slotted proxy of the pool."""
+
+    __slots__ = ("conn", "balance_changes")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.balance_changes = [] # (user ID, amount, balance, reason)
+
+    async def execute(self, query, *args):
+        with utils.timed_query():
+            return await self.conn.execute(query, *args)
+
+    async def fetch(self, query, *args):
+        with utils.timed_query():
+            return await self.conn.fetch(query, *args)
+
+    async def fetchrow(self, query, *args):
+        with utils.timed_query():
+            return await self.conn.fetchrow(query, *args)
+
+    async def fetchval(self, query, *args):
+        with utils.timed_query():
+            return await self.conn.fetchval(query, *args)
+
+
 class Bot(commands.Bot):
     """Represents the Discord Bot."""
 
@@ -57,6 +92,23 @@ class Bot(commands.Bot):
         self.connections_channel = 540257299931987979
         self.support_guild = utils.support_guild_id
         self.conn_pool = None
+        self.prefixes = utils.LRUCache(maxsize=10000) # Guild ID -> custom prefix, `None` for the default one
+        self.log_channels = utils.LRUCache(maxsize=10000) # Guild ID -> log channel ID, `None` if logs are not activated
+        self.log_dispatcher = utils.LogDispatcher(self)
+        self.blacklisted_users = set()
+        self.blacklisted_guilds = set()
+        self.premium_guilds = set()
+        self.autoroles = {} # Message ID -> {emoji ID -> autorole}
+        self._resolutions = utils.SingleFlight() # Guild and member fetches in progress
+        self.role_updates = utils.RoleCoalescer()
+        self.ranks = utils.RankIndex()
+        self.pending_commands = {} # User ID -> [number of commands not yet written, last context]
+        self.pending_ledger = [] # Ledger entries not yet written
+        self.query_metrics = utils.QueryMetrics()
+        self.usernames = utils.LRUCache(maxsize=1000) # User ID -> name of a user fetched from the API
+        self.leaderboard = () # (name, balance, rank) of the top 100 players
+        self.leaderboard_time = None # Time of the last leaderboard snapshot
+        self.command_achievements = tuple((progress, name) for name, progress, column in utils.achievements if column == "commands")
         self.activity = discord.Activity(name="@Brisk help", type=discord.ActivityType.watching)
 
         self.logfile = "./resources/discord.log"
@@ -75,24 +127,114 @@ class Bot(commands.Bot):
         self.defaultline = tuple([0]*(len(self.dbuserinfos)-1))
     
 
-    async def create_db_pool(self, password: str):
-        """Creates a connection pool to the database."""
-        self.conn_pool = await asyncpg.create_pool(user="brisk_app", password=password, database="brisk")
+    async def create_db_pool(self, password: str, min_size: int = 2, max_size: int = 10, statement_cache_size: int = 100):
+        """Creates a connection pool to the database. Every query of `utils.Queries` is prepared on each new connection."""
+        self.conn_pool = await asyncpg.create_pool(
+            user="brisk_app", password=password, database="brisk",
+            min_size=min_size, max_size=max_size, statement_cache_size=statement_cache_size,
+            connection_class=BriskConnection, init=self.prepare_statements
+        )
+        for table in (utils.Schema.Ledger,):
+            await self.execute(table)
+        await self.load_caches()
+        await self.load_ranks()
+
+
+    async def prepare_statements(self, conn: BriskConnection):
+        """Prepares the queries of the catalog on a new connection of the pool."""
+        for query in utils.catalog_queries():
+            conn.statements[query] = await conn.prepare(query)
+
+
+    async def load_caches(self):
+        """Loads the rarely modified tables which are checked on every command into memory.
+        Lazily cached tables are cleared, to be loaded again on their next use."""
+        self.prefixes.clear()
+        self.log_channels.clear()
+        self.blacklisted_users = {record["user_id"] for record in await self.fetch(utils.Queries.GetBlacklistedUsers)}
+        self.blacklisted_guilds = {record["server_id"] for record in await self.fetch(utils.Queries.GetBlacklistedServers)}
+        self.premium_guilds = {record["server_id"] for record in await self.fetch(utils.Queries.GetPremiumServers)}
+        self.autoroles = {record["message_id"]: utils.build_autoroles(*tuple(record)[2:]) for record in await self.fetch(utils.Queries.GetAutoroles)}
+
+
+    async def load_ranks(self):
+        """Builds the rank index from the balances stored in the database. Balances updated while they are fetched are kept."""
+        with self.ranks.recording() as changes:
+            records = await self.fetch(utils.Queries.GetBalances)
+        self.ranks.build((tuple(record) for record in records), changes)
     
 
+    async def get_guild_prefix(self, guild_id):
+        """Returns the custom prefix of a guild, or `None` if the guild uses the default prefix. The database is only queried on a cache miss."""
+        prefix = self.prefixes.get(guild_id, utils.MISSING)
+        if prefix is utils.MISSING:
+            prefix = await self.fetchval(utils.Queries.GetPrefix, guild_id)
+            self.prefixes[guild_id] = prefix
+        return prefix
+
+
+    async def get_log_channel_id(self, guild_id):
+        """Returns the ID of the log channel of a guild, or `None` if logs are not activated. The database is only queried on a cache miss."""
+        channel_id = self.log_channels.get(guild_id, utils.MISSING)
+        if channel_id is utils.MISSING:
+            channel_id = await self.fetchval(utils.Queries.GetLogChannel, guild_id)
+            self.log_channels[guild_id] = channel_id
+        return channel_id
+
+
+    async def get_log_channel(self, guild):
+        """Returns the log channel of a guild from the channel cache, or `None` if logs are not activated. Logs are deactivated if the channel no longer exists."""
+        channel_id = await self.get_log_channel_id(guild.id)
+        if channel_id is None:
+            return None
+        channel = guild.get_channel(channel_id)
+        if channel is None:
+            await self.execute(utils.Queries.DeleteLogChannel, guild.id)
+            self.log_channels[guild.id] = None
+        return channel
+
+
+    async def resolve_guild(self, guild_id):
+        """Returns a guild from the gateway cache, fetching it only if it is not cached. Returns `None` if it cannot be found."""
+        guild = self.get_guild(guild_id)
+        if guild is not None:
+            return guild
+        try: return await self._resolutions.do(("guild", guild_id), self.fetch_guild, guild_id)
+        except discord.HTTPException: return None
+
+
+    async def resolve_member(self, guild, member_id):
+        """Returns a member of a guild from the gateway cache, fetching it only if it is not cached. Returns `None` if it cannot be found."""
+        member = guild.get_member(member_id)
+        if member is not None:
+            return member
+        try: return await self._resolutions.do(("member", guild.id, member_id), guild.fetch_member, member_id)
+        except discord.HTTPException: return None
+
+
+    async def get_user_state(self, ctx, user, refresh=False):
+        """Returns the `UserState` of a user. Rows are fetched in a single query, at most once per invocation unless `refresh` is `True`."""
+        states = getattr(ctx, "user_states", None)
+        if states is None:
+            states = ctx.user_states = {} # User ID -> state
+        state = None if refresh else states.get(user.id)
+        if state is None:
+            state = states[user.id] = utils.UserState(*await self.fetchrow(utils.Queries.GetUserState, user.id))
+        return state
+
+
     async def get_global_gdp(self):
-        """Returns the global GDP."""
-        return await self.fetchval("SELECT SUM(money) FROM users")
+        """Returns the global GDP, kept up to date by the rank index."""
+        return self.ranks.total
 
 
     async def trigger_achievement(self, ctx: commands.Context, name: str, destination: discord.TextChannel = None):
         """Function to trigger the achievement message. If destination is `None`, message is sent to `ctx`."""
         if not destination:
             destination = ctx
-        with open(utils.Files.Achievements) as a:
-            dictionary = json.load(a)[name]
+        dictionary = utils.resources.achievements[name]
         reward = dictionary["reward"]
-        await self.addmoney(ctx.author, reward)
+        await self.addmoney(ctx.author, reward, reason="achievement")
         embed = discord.Embed(title=":trophy: **Achievement unlocked**", colour=0x42b581)
         embed.set_author(name=str(ctx.author), icon_url=ctx.author.avatar_url)
         embed.add_field(name=f"{utils.CustomEmojis.GreenCheck} {name} (+ {utils.CustomEmojis.Smilo}{utils.number_format(reward)})", value="*{}*".format(dictionary["revealed"]))
@@ -104,7 +246,7 @@ class Bot(commands.Bot):
         if unlocked:
             return ("{} {} - {}{}".format(utils.CustomEmojis.GreenCheck, name, utils.CustomEmojis.Smilo, utils.number_format(dictionary["reward"])), "*{}*".format(dictionary["revealed"]))
         _hidden = dictionary["hidden"]
-        hidden = choice(_hidden) if isinstance(_hidden, list) else _hidden
+        hidden = choice(_hidden) if isinstance(_hidden, tuple) else _hidden
         if progress:
             return ("{} {} - {}{}".format(utils.CustomEmojis.RedCross, name, utils.CustomEmojis.Smilo, utils.number_format(dictionary["reward"])), hidden + f" ({utils.number_format(progress[0])}/{utils.number_format(progress[1])})")
         return ("{} {} - {}{}".format(utils.CustomEmojis.RedCross, name, utils.CustomEmojis.Smilo, utils.number_format(dictionary["reward"])), hidden)
@@ -161,47 +303,87 @@ class Bot(commands.Bot):
         )
     
 
+    async def invoke(self, ctx):
+        """Invokes a command, counting the queries it runs in `query_metrics`."""
+        with utils.track_queries() as stats:
+            await super().invoke(ctx)
+        if ctx.command is not None:
+            self.query_metrics.record(ctx.command.qualified_name, stats)
+
+
+    # Queries of the catalog run their prepared statement, other queries are sent as is
+    # Every query is counted in the statistics of the command being invoked, see `utils.track_queries`
+
     async def execute(self, query: str, *args):
-        async with self.conn_pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute(query, *args)
+        with utils.timed_query():
+            async with self.conn_pool.acquire() as conn:
+                async with conn.transaction():
+                    statement = conn.statements.get(query)
+                    if statement is None:
+                        await conn.execute(query, *args)
+                    else:
+                        await statement.fetch(*args)
 
 
     async def fetchrow(self, query: str, *args):
-        async with self.conn_pool.acquire() as conn:
-            async with conn.transaction():
-                values = await conn.fetchrow(query, *args)
+        with utils.timed_query():
+            async with self.conn_pool.acquire() as conn:
+                statement = conn.statements.get(query)
+                values = await (conn.fetchrow(query, *args) if statement is None else statement.fetchrow(*args))
         return values
 
 
     async def fetchval(self, query: str, *args):
-        async with self.conn_pool.acquire() as conn:
-            async with conn.transaction():
-                value = await conn.fetchval(query, *args)
+        with utils.timed_query():
+            async with self.conn_pool.acquire() as conn:
+                statement = conn.statements.get(query)
+                value = await (conn.fetchval(query, *args) if statement is None else statement.fetchval(*args))
         return value
     
     async def fetch(self, query: str, *args):
+        with utils.timed_query():
+            async with self.conn_pool.acquire() as conn:
+                statement = conn.statements.get(query)
+                values = await (conn.fetch(query, *args) if statement is None else statement.fetch(*args))
+        return values
+
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """Yields a `UnitOfWork` whose statements all run on one connection, in the same transaction. The transaction is committed on exit, or rolled back if an exception is raised."""
         async with self.conn_pool.acquire() as conn:
+            work = UnitOfWork(conn)
             async with conn.transaction():
-                values = await conn.fetch(query, *args)
-        return values
+                yield work
+            for change in work.balance_changes:
+                self.apply_balance_change(*change)
+
+
+    def apply_balance_change(self, user_id, amount, balance, reason):
+        """Updates the rank index with the new balance of a user and records the change in the ledger."""
+        self.ranks.update(user_id, balance)
+        if amount:
+            self.pending_ledger.append((user_id, amount, balance, reason, datetime.utcnow()))
+
+
+    def balance_changed(self, user_id, amount, balance, reason, work):
+        """Applies a balance change, or defers it until `work` is committed."""
+        if work is None:
+            self.apply_balance_change(user_id, amount, balance, reason)
+        else:
+            work.balance_changes.append((user_id, amount, balance, reason))
     
 
     async def addline(
         self, user_id, money=0, level=0, xp=0, commands=0, detective=False,
         codebreaker=False, rps=0, coinflipping=0, mentalist=False, mathdestroy=False,
-        cats=0, dogs=0, roll=False):
-        """Adds a new line in the database."""
-        detective = str(detective).lower()
-        codebreaker = str(codebreaker).lower()
-        mentalist = str(mentalist).lower()
-        mathdestroy = str(mathdestroy).lower()
-        roll = str(roll).lower()
-        await self.execute(f"""
-            INSERT INTO users(id, money, level, xp, commands, detective, codebreaker, rps, coinflipping, mentalist, mathdestroy, cats, dogs, roll)
-            VALUES($1,$2,$3,$4,$5,{detective},{codebreaker},$6,$7,{mentalist},{mathdestroy},$8,$9,{roll})
-            """, user_id, money, level, xp, commands, rps, coinflipping, cats, dogs
+        cats=0, dogs=0, roll=False, work=None, reason=None):
+        """Adds a new line in the database. Runs in `work` if given, see `unit_of_work`."""
+        await (self if work is None else work).execute(
+            utils.Queries.AddUser, user_id, money, level, xp, commands, detective,
+            codebreaker, rps, coinflipping, mentalist, mathdestroy, cats, dogs, roll
         )
+        self.balance_changed(user_id, money, money, reason, work)
 
 
     def is_default_line(self, line):
@@ -209,34 +391,109 @@ class Bot(commands.Bot):
         return line == self.defaultline
 
 
-    async def addmoney(self, user, amount):
-        """Adds `amount` of money to a user."""
-        result = await self.fetchval("SELECT money FROM users WHERE id = $1", user.id)
-        if result is None:
-            await self.addline(user.id, money=amount)
-            return
-        await self.execute("UPDATE users SET money = $1 WHERE id = $2", result+amount, user.id)
+    async def addmoney(self, user, amount, work=None, reason=None):
+        """Adds `amount` of money to a user and returns the new balance. `reason` is recorded in the ledger. Runs in `work` if given, see `unit_of_work`."""
+        money = await (self if work is None else work).fetchval(utils.Queries.AddMoney, user.id, amount)
+        self.balance_changed(user.id, amount, money, reason, work)
+        return money
 
 
-    async def removemoney(self, user, amount):
-        """Removes `amount` of money to a user. Raises `ValueError` if the user doesn't have enough."""
-        result = await self.fetchval("SELECT money FROM users WHERE id = $1", user.id)
-        if not result or result < amount:
+    async def removemoney(self, user, amount, work=None, reason=None):
+        """Removes `amount` of money to a user and returns the previous balance. Raises `ValueError` if the user doesn't have enough. `reason` is recorded in the ledger. Runs in `work` if given, see `unit_of_work`."""
+        result = await (self if work is None else work).fetchval(utils.Queries.RemoveMoney, user.id, amount)
+        if result is None:
             raise ValueError
-        await self.execute("UPDATE users SET money = $1 WHERE id = $2", result-amount, user.id)
+        self.balance_changed(user.id, -amount, result - amount, reason, work)
         return result
 
 
-    async def resetmoney(self, user):
-        """Resets someone's balance."""
-        result = await self.execute("SELECT money FROM users WHERE id = $1", user.id)
-        if not result:
+    async def resetmoney(self, user, work=None, reason=None):
+        """Resets someone's balance and returns the previous one, `None` if the user is not in the database. `reason` is recorded in the ledger. Runs in `work` if given, see `unit_of_work`."""
+        previous = await (self if work is None else work).fetchval(utils.Queries.ResetMoney, user.id)
+        if previous is not None:
+            self.balance_changed(user.id, -previous, 0, reason, work)
+        return previous
+
+
+    async def transfermoney(self, sender, receiver, amount, tax=0, reason="give"):
+        """Transfers `amount` of money from `sender` to `receiver` in a single transaction, `tax` being taken from `sender` on top of `amount`. Raises `ValueError` if the sender doesn't have enough."""
+        async with self.unit_of_work() as work:
+            await self.removemoney(sender, amount, work=work, reason=reason)
+            if tax:
+                await self.removemoney(sender, tax, work=work, reason="tax")
+            await self.addmoney(receiver, amount, work=work, reason=reason)
+
+
+    async def flush_ledger(self):
+        """Writes the buffered ledger entries to the database with a single COPY."""
+        if not self.pending_ledger:
             return
-        await self.execute("UPDATE users SET money = 0 WHERE id = $1", user.id)
+        entries, self.pending_ledger = self.pending_ledger, []
+        try:
+            async with self.conn_pool.acquire() as conn:
+                await conn.copy_records_to_table("ledger", records=entries, columns=("user_id", "amount", "balance", "reason", "created_at"))
+        except:
+            # Put the entries back so that they are written by the next flush
+            self.pending_ledger[:0] = entries
+            raise
     
 
+    async def flush_command_counts(self):
+        """Writes the buffered command counts to the database in a single query and triggers the command achievements reached."""
+        if not self.pending_commands:
+            return
+        pending, self.pending_commands = self.pending_commands, {}
+        try:
+            records = await self.fetch(utils.Queries.AddCommands, list(pending), [count for count, _ in pending.values()])
+        except:
+            # Put the counts back so that they are written by the next flush
+            for user_id, (count, ctx) in pending.items():
+                self.pending_commands.setdefault(user_id, [0, ctx])[0] += count
+            raise
+
+        for record in records:
+            count, ctx = pending[record["id"]]
+            total = record["commands"]
+            for threshold, name in self.command_achievements:
+                # Counts are incremented atomically, so each threshold is crossed by exactly one flush
+                if total - count < threshold <= total:
+                    try: await self.trigger_achievement(ctx, name)
+                    except: pass
+
+
+    async def get_username(self, user_id):
+        """Returns the name to display for a user, from the user cache if possible."""
+        user = self.get_user(user_id)
+        if user is not None:
+            return str(user)
+        username = self.usernames.get(user_id)
+        if username is not None:
+            return username
+        try:
+            username = str(await self._resolutions.do(("user", user_id), self.fetch_user, user_id))
+        except discord.NotFound:
+            username = "Deleted User"
+        except discord.HTTPException:
+            return "Unknown User"
+        self.usernames[user_id] = username
+        return username
+
+
+    async def refresh_leaderboard(self):
+        """Takes a new snapshot of the top 100 players, with the names to display already resolved."""
+        leaderboard = []
+        for user_id, amount, rank, public in await self.fetch(utils.Queries.GetLeaderboard):
+            leaderboard.append(((await self.get_username(user_id)) if public else "Mystery User", amount, rank))
+        self.leaderboard = tuple(leaderboard)
+        self.leaderboard_time = datetime.utcnow()
+
+
     async def close_connection(self):
         """Close the connection to Discord and database."""
+        try: await self.flush_command_counts()
+        except: pass
+        try: await self.flush_ledger()
+        except: pass
         try: await self.conn_pool.close()
         except: pass
         try: await self.close()
@@ -256,8 +513,7 @@ class Bot(commands.Bot):
             if ctx.guild.id in (self.dev_guild, self.support_guild):
                 return True
 
-            data = await self.fetchrow("SELECT * FROM premiumservers WHERE server_id = $1", ctx.guild.id)
-            if data is None:
+            if ctx.guild.id not in self.premium_guilds:
                 raise utils.PremiumRestricted
 
             return True
@@ -265,8 +521,17 @@ class Bot(commands.Bot):
         return commands.check(predicate)
 
 
+class BriskSlashCommand(SlashCommand):
+    """Slash command handler counting the queries of each command in `Bot.query_metrics`."""
+
+    async def invoke_command(self, func, ctx, args):
+        with utils.track_queries() as stats:
+            await super().invoke_command(func, ctx, args)
+        self._discord.query_metrics.record("/" + ctx.name, stats)
+
+
 bot = Bot()
-slash = SlashCommand(bot, sync_commands=True)
+slash = BriskSlashCommand(bot, sync_commands=True)
 DiscordComponents(bot)
 
 
@@ -281,14 +546,11 @@ async def verify_user_and_server(ctx):
     if bot.disabled:
         raise utils.BotDisabledError
 
-    res = await bot.fetchrow("SELECT * FROM blacklistedusers WHERE user_id = $1", ctx.author.id)
-    if res is not None:
+    if ctx.author.id in bot.blacklisted_users:
         raise utils.UserForbidden
 
-    if ctx.guild:
-        res2 = await bot.fetchrow("SELECT * FROM blacklistedservers WHERE server_id = $1", ctx.guild.id)
-        if res2 is not None:
-            raise utils.ServerForbidden
+    if ctx.guild and ctx.guild.id in bot.blacklisted_guilds:
+        raise utils.ServerForbidden
     
     return True
 
@@ -311,31 +573,13 @@ async def on_ready():
 @bot.event
 async def on_command_completion(ctx):
     """Event triggered when a command has been successfully completed."""
-    count = await bot.fetchval("SELECT commands FROM users WHERE id = $1", ctx.author.id)
-    if count is None:
-        await bot.addline(ctx.author.id, commands=1)
-        return
-    
-    count += 1
-    await bot.execute("UPDATE users SET commands = $1 WHERE id = $2", count, ctx.author.id)
-
-    if count == 50:
-        await bot.trigger_achievement(ctx, "First Step")
-        return
-    if count == 250:
-        await bot.trigger_achievement(ctx, "Shy Guy")
-        return
-    if count == 1000:
-        await bot.trigger_achievement(ctx, "Geek")
+    # Counts are written by `flush_pending_writes`
+    pending = bot.pending_commands.get(ctx.author.id)
+    if pending is None:
+        bot.pending_commands[ctx.author.id] = [1, ctx]
         return
-    if count == 5000:
-        await bot.trigger_achievement(ctx, "Addicted")
-        return
-    if count == 10000:
-        await bot.trigger_achievement(ctx, "Robot")
-        return
-    if count == 20000:
-        await bot.trigger_achievement(ctx, "Legend")
+    pending[0] += 1
+    pending[1] = ctx
 
 
 @bot.event
@@ -446,17 +690,11 @@ async def on_message_delete(message):
     """Event triggered on a message deletion."""
     if message.guild is None:
         return
-    result = await bot.fetchval("SELECT channel_id FROM logs WHERE server_id = $1", message.guild.id)
-    if result is None:
-        await bot.execute("DELETE FROM logs WHERE server_id = $1", message.guild.id)
-        return
-    
-    channel = await bot.fetch_channel(result)
+    channel = await bot.get_log_channel(message.guild)
     if channel is None:
-        await bot.execute("DELETE FROM logs WHERE server_id = $1", message.guild.id)
         return
     try:
-        embed = discord.Embed(color=bot.embedcolours["MessageDeletion"], timestamp=datetime.utcnow())
+        embed = discord.Embed(color=utils.EmbedColours.MessageDeletion, timestamp=datetime.utcnow())
         embed.set_author(name="Message deleted", icon_url=message.author.avatar_url)
         #embed.set_thumbnail(url=message.author.avatar_url)
         #embed.add_field(name="Author", value="**{}**\n*ID: {}*".format(str(message.author), message.author.id), inline=True)
@@ -466,11 +704,10 @@ async def on_message_delete(message):
         #embed.add_field(name="TTS", value="Yes" if message.tts else "No")
         #embed.add_field(name="Pinned", value="Yes" if message.pinned else "No", inline=False)
         embed.add_field(name="Message ID", value=message.id, inline=False)
-        try:
-            embed.add_field(name="Content", value=message.content, inline=False)
-        except:
-            pass
-        await channel.send(embed=embed)
+        # Embed fields are limited to 1024 characters and cannot be empty
+        if message.content:
+            embed.add_field(name="Content", value=message.content[:1024], inline=False)
+        bot.log_dispatcher.post(channel, embed)
     except:
         return
 
@@ -481,30 +718,36 @@ async def on_message_edit(before, after):
     if (after.guild is None) or (before.content == after.content) or (after.author.bot):
         return
     
-    result = await bot.fetchval("SELECT channel_id FROM logs WHERE server_id = $1", after.guild.id)
-    if result is None:
-        await bot.execute("DELETE FROM logs WHERE server_id = $1", after.guild.id)
-        return
-    
-    channel = await bot.fetch_channel(result)
+    channel = await bot.get_log_channel(after.guild)
     if channel is None:
-        await bot.execute("DELETE FROM logs WHERE server_id = $1", after.guild.id)
         return
     
     try:
-        embed = discord.Embed(description=f"[Jump to message]({after.jump_url})", color=bot.embedcolours["MessageEdition"], timestamp=datetime.utcnow())
+        embed = discord.Embed(description=f"[Jump to message]({after.jump_url})", color=utils.EmbedColours.MessageEdition, timestamp=datetime.utcnow())
         embed.set_author(name="Message edited", icon_url=after.author.avatar_url)
         # embed.set_thumbnail(url=after.author.avatar_url)
         embed.add_field(name="Author", value=after.author.mention)
         embed.add_field(name="Channel", value=after.channel.mention)
         embed.add_field(name="Message ID", value=after.id, inline=False)
-        embed.add_field(name="Before", value=before.content, inline=False)
-        embed.add_field(name="After", value=after.content, inline=False)
-        await channel.send(embed=embed)
+        # Embed fields are limited to 1024 characters and cannot be empty
+        if before.content:
+            embed.add_field(name="Before", value=before.content[:1024], inline=False)
+        if after.content:
+            embed.add_field(name="After", value=after.content[:1024], inline=False)
+        bot.log_dispatcher.post(channel, embed)
     except:
         return
 
 
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Event triggered when a guild channel has been deleted."""
+    bot.log_dispatcher.forget(channel.id)
+    if bot.log_channels.get(channel.guild.id) == channel.id:
+        await bot.execute(utils.Queries.DeleteLogChannel, channel.guild.id)
+        bot.log_channels[channel.guild.id] = None
+
+
 @bot.event
 async def on_raw_reaction_add(payload):
     """Event triggered when a reaction has been added."""
@@ -513,27 +756,19 @@ async def on_raw_reaction_add(payload):
 
     if member.bot: return
 
-    emoji_id = str(payload.emoji) if payload.emoji.id is None else str(payload.emoji.id)
-    result = await bot.fetchrow("SELECT * FROM autoroles WHERE message_id = $1", payload.message_id)
-    if result is None:
-        return
-    
-    try: guild = await bot.fetch_guild(payload.guild_id)
-    except: return
-    
-    roles_id, emojis_id, restrictions, _, inverses, msgs = result[2:]
-
-    try: list_index = emojis_id.index(emoji_id)
-    except ValueError: return
+    autoroles = bot.autoroles.get(payload.message_id)
+    if autoroles is None: return
 
-    inversed = inverses[list_index]
+    autorole = autoroles.get(str(payload.emoji) if payload.emoji.id is None else str(payload.emoji.id))
+    if autorole is None: return
+    
+    guild = await bot.resolve_guild(payload.guild_id)
+    if guild is None: return
 
-    role = guild.get_role(roles_id[list_index])
+    role = guild.get_role(autorole.role_id)
     if role is None: return
 
-    if (inversed and role not in member.roles) or (not inversed and role in member.roles): return
-
-    restriction = restrictions[list_index]
+    restriction = autorole.restriction_id
     if restriction:
         restriction = guild.get_role(restriction)
         if restriction is None: return
@@ -542,16 +777,7 @@ async def on_raw_reaction_add(payload):
     
     if restriction and restriction not in member.roles: return
 
-    if inversed:
-        try: await member.remove_roles(role, reason="Autorole")
-        except: return
-    else:
-        try: await member.add_roles(role, reason="Autorole")
-        except: return
-    
-    if msgs[list_index]:
-        try: await member.send("{0} I successfully {1} the role **{2}**{3}".format(utils.CustomEmojis.GreenCheck, ("removed" if inversed else "gave you"), role.name, (" from you." if inversed else ".")))
-        except: return
+    bot.role_updates.request(member, role, not autorole.inversed, autorole.send_dm)
 
 
 @bot.event
@@ -559,37 +785,22 @@ async def on_raw_reaction_remove(payload):
     """Event triggered when a reaction has been removed."""    
     if payload.guild_id is None: return
 
-    try: guild = await bot.fetch_guild(payload.guild_id)
-    except: return
+    autoroles = bot.autoroles.get(payload.message_id)
+    if autoroles is None: return
 
-    try: member = await guild.fetch_member(payload.user_id)
-    except: return
+    autorole = autoroles.get(str(payload.emoji) if payload.emoji.id is None else str(payload.emoji.id))
+    if autorole is None or autorole.locked: return
 
-    if member.bot: return
-    
-    emoji_id = str(payload.emoji) if payload.emoji.id is None else str(payload.emoji.id)
-    result = await bot.fetchrow("SELECT * FROM autoroles WHERE message_id = $1", payload.message_id)
-    if result is None:
-        return
-    
-    try: guild = await bot.fetch_guild(payload.guild_id)
-    except: return
-    
-    roles_id, emojis_id, restrictions, locks, inverses, msgs = result[2:]
-
-    try: list_index = emojis_id.index(emoji_id)
-    except ValueError: return
+    guild = await bot.resolve_guild(payload.guild_id)
+    if guild is None: return
 
-    if locks[list_index]: return
-    
-    inversed = inverses[list_index]
+    member = await bot.resolve_member(guild, payload.user_id)
+    if member is None or member.bot: return
 
-    role = guild.get_role(roles_id[list_index])
+    role = guild.get_role(autorole.role_id)
     if role is None: return
 
-    if (not inversed and role not in member.roles) or (inversed and role in member.roles): return
-
-    restriction = restrictions[list_index]
+    restriction = autorole.restriction_id
     if restriction:
         restriction = guild.get_role(restriction)
         if restriction is None: return
@@ -598,16 +809,7 @@ async def on_raw_reaction_remove(payload):
     
     if restriction and restriction not in member.roles: return
 
-    if inversed:
-        try: await member.add_roles(role, reason="Autorole")
-        except: return
-    else:
-        try: await member.remove_roles(role, reason="Autorole")
-        except: return
-    
-    if msgs[list_index]:
-        try: await member.send("{} I successfully {} the role **{}**{}".format(utils.CustomEmojis.GreenCheck, ("gave you" if inversed else "removed"), role.name, ("." if inversed else " from you.")))
-        except: return
+    bot.role_updates.request(member, role, autorole.inversed, autorole.send_dm)
 
 
 @bot.command()
@@ -635,6 +837,9 @@ async def execute(ctx, *, query: str = None):
         await bot.execute(query)
     except Exception as e:
         raise utils.SpecialError(e)
+    # The query may have modified cached tables or balances
+    await bot.load_caches()
+    await bot.load_ranks()
 
     await ctx.send("{} **Successfully executed the query!**".format(utils.CustomEmojis.GreenCheck))
 
@@ -657,9 +862,46 @@ async def fetch(ctx, *, query: str = None):
     await ctx.send("{} Value fetched: **{}**.".format(utils.CustomEmojis.GreenCheck, res))
 
 
+# ------------------- TASKS -------------------
+@tasks.loop(minutes=10)
+async def reconcile_caches():
+    """Reloads the cached tables and the balances to pick up modifications made outside the bot."""
+    try:
+        await bot.load_caches()
+        await bot.load_ranks()
+    except: bot.logger.exception("Reloading cached tables failed")
+
+
+@tasks.loop(minutes=2)
+async def refresh_leaderboard():
+    """Takes a new snapshot of the leaderboard. Names fetched from the API are fetched again every 30 minutes."""
+    if refresh_leaderboard.current_loop % 15 == 0:
+        bot.usernames.clear()
+    try: await bot.refresh_leaderboard()
+    except: bot.logger.exception("Refreshing the leaderboard failed")
+
+
+@refresh_leaderboard.before_loop
+async def before_refresh_leaderboard():
+    """Waits for the bot to be logged in, as names are resolved through the user cache and the API."""
+    await bot.wait_until_ready()
+
+
+@tasks.loop(seconds=5)
+async def flush_pending_writes():
+    """Writes the buffered command counts and ledger entries to the database."""
+    try: await bot.flush_command_counts()
+    except: bot.logger.exception("Writing command counts failed")
+    try: await bot.flush_ledger()
+    except: bot.logger.exception("Writing ledger entries failed")
+
+
 async def run_app():
     try:
         await bot.create_db_pool(DB_TOKEN)
+        reconcile_caches.start()
+        flush_pending_writes.start()
+        refresh_leaderboard.start()
         await bot.start(TOKEN)
     except KeyboardInterrupt:
         await bot.close_connection()
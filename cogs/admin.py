@@ -79,7 +79,7 @@ class Admin(commands.Cog):
     @utils.set_cooldown(per=900.0, alter_per=600.0)
     async def prefix(self, ctx, pref=None):
         if pref is None:
-            prefix = await self.bot.fetchval("SELECT prefix FROM prefixes WHERE server_id = $1", ctx.guild.id)
+            prefix = await self.bot.get_guild_prefix(ctx.guild.id)
             if prefix is None:
                 await ctx.send(f":point_right: No custom prefix has been set! **{self.bot.commandprefix}** is the default one.")
                 return
@@ -91,14 +91,15 @@ class Admin(commands.Cog):
             await ctx.send(":point_right: **The prefix you entered is invalid!**\nThe prefix must be from one to five characters long (the characters allowed are letters, whitespaces and `,?;.:!%-=^$+><|/`). Whitespaces are taken into account from the second character.")
             return
 
-        prefix = await self.bot.fetchval("SELECT prefix FROM prefixes WHERE server_id = $1", ctx.guild.id)
+        prefix = await self.bot.get_guild_prefix(ctx.guild.id)
 
         if prefix is None:
             if pref == self.bot.commandprefix:
                 await ctx.send(f":point_right: **{self.bot.commandprefix}** is already set as the server prefix (default prefix).")
                 return
 
-            await self.bot.execute("INSERT INTO prefixes(server_id, prefix) VALUES ($1,$2)", ctx.guild.id, pref)
+            await self.bot.execute(utils.Queries.InsertPrefix, ctx.guild.id, pref)
+            self.bot.prefixes[ctx.guild.id] = pref
             await ctx.send("{0} **{1}** is now the server prefix!\nExample: `{1}ping`".format(utils.CustomEmojis.GreenCheck, pref))
             return
 
@@ -107,11 +108,13 @@ class Admin(commands.Cog):
             return
 
         if pref == self.bot.commandprefix:
-            await self.bot.execute("DELETE FROM prefixes WHERE server_id = $1", ctx.guild.id)
+            await self.bot.execute(utils.Queries.DeletePrefix, ctx.guild.id)
+            self.bot.prefixes[ctx.guild.id] = None
             await ctx.send(f":point_right: The server prefix has been reset to **{self.bot.commandprefix}** (default prefix).")
             return
 
-        await self.bot.execute("UPDATE prefixes SET prefix = $1 WHERE server_id = $2", pref, ctx.guild.id)
+        await self.bot.execute(utils.Queries.UpdatePrefix, ctx.guild.id, pref)
+        self.bot.prefixes[ctx.guild.id] = pref
         await ctx.send("{0} The server prefix has been replaced with **{1}**!\nExample: `{1}ping`".format(utils.CustomEmojis.GreenCheck, pref))
 
     @commands.group(invoke_without_command=True, case_insensitive=True, aliases=["autoroles"])
@@ -119,7 +122,7 @@ class Admin(commands.Cog):
     @utils.set_cooldown(per=60.0, alter_per=30.0)
     async def autorole(self, ctx, message=None):
         if message is None:
-            result = await self.bot.fetch("SELECT message_id, roles_id FROM autoroles WHERE server_id = $1", ctx.guild.id)
+            result = await self.bot.fetch(utils.Queries.GetGuildAutoroles, ctx.guild.id)
             if not result:
                 await ctx.send(":point_right: **No autoroles were set in this server!**")
                 return
@@ -144,7 +147,7 @@ class Admin(commands.Cog):
         try: message = await commands.MessageConverter().convert(ctx, message)
         except: raise utils.ConverterNotFoundError("Message")
 
-        result = await self.bot.fetchrow("SELECT * FROM autoroles WHERE message_id = $1", message.id)
+        result = await self.bot.fetchrow(utils.Queries.GetAutorole, message.id)
         if result is None:
             await ctx.send(":point_right: **No autoroles were set for this message!**")
             return
@@ -196,15 +199,14 @@ class Admin(commands.Cog):
         length = len(new_roles_ids)
         
         if empty:
-            await self.bot.execute("DELETE FROM autoroles WHERE message_id = $1", message.id)
+            await self.bot.execute(utils.Queries.DeleteAutorole, message.id)
+            self.bot.autoroles.pop(message.id, None)
             await ctx.send(":point_right: **No autoroles were set for this message!**")
             return
         
         if not full:
-            await self.bot.execute(
-                """UPDATE autoroles SET roles_id = $1, emojis = $2, restrictions = $3, locks = $4, inverses = $5, msgs_sent = $6
-                WHERE message_id = $7""", new_roles_ids, new_emoji_ids, new_restrictions_id, new_locked, new_invs, new_msgs, message.id
-            )
+            await self.bot.execute(utils.Queries.UpdateAutorole, message.id, new_roles_ids, new_emoji_ids, new_restrictions_id, new_locked, new_invs, new_msgs)
+            self.bot.autoroles[message.id] = utils.build_autoroles(new_roles_ids, new_emoji_ids, new_restrictions_id, new_locked, new_invs, new_msgs)
         
         embed = discord.Embed(
             title=":triangular_flag_on_post: Autoroles",
@@ -306,12 +308,13 @@ class Admin(commands.Cog):
         embed = discord.Embed(title="Do you want the bot to send a DM to the user after he reacts?", colour=colour)
         msg = await utils.ask_userinput(ctx=ctx, bot=self.bot, embed=embed, use_reactions=True)
         
-        search = await self.bot.fetchrow("SELECT * FROM autoroles WHERE message_id = $1", message.id)
+        search = await self.bot.fetchrow(utils.Queries.GetAutorole, message.id)
         if not search:
             await self.bot.execute(
-                "INSERT INTO autoroles VALUES($1,$2,$3,$4,$5,$6::boolean[],$7::boolean[],$8::boolean[])",
+                utils.Queries.InsertAutorole,
                 ctx.guild.id, message.id, [role.id], [emoji_id], [role_restr_id], [locked], [inversed], [msg]
             )
+            self.bot.autoroles[message.id] = utils.build_autoroles([role.id], [emoji_id], [role_restr_id], [locked], [inversed], [msg])
             try: await message.add_reaction(emoji)
             except discord.Forbidden: raise utils.BotMissingPermissions(on_guild=False, missing_perms=("add_reactions",))
             except (discord.NotFound, discord.InvalidArgument): raise utils.SpecialError(":point_right: **Error: I could not find this emoji!**")
@@ -336,10 +339,8 @@ class Admin(commands.Cog):
         inverses = search[6]+[inversed]
         msgs = search[7]+[msg]
 
-        await self.bot.execute(
-            "UPDATE autoroles SET roles_id = $1, emojis = $2, restrictions = $3, locks = $4::boolean[], inverses = $5::boolean[], msgs_sent = $6::boolean[] WHERE message_id = $7",
-            roles, emojis, restrictions, locks, inverses, msgs, message.id
-        )
+        await self.bot.execute(utils.Queries.UpdateAutorole, message.id, roles, emojis, restrictions, locks, inverses, msgs)
+        self.bot.autoroles[message.id] = utils.build_autoroles(roles, emojis, restrictions, locks, inverses, msgs)
 
         try: await message.add_reaction(emoji)
         except discord.Forbidden: raise utils.BotMissingPermissions(on_guild=False, missing_perms=("add_reactions",))
@@ -383,7 +384,7 @@ class Admin(commands.Cog):
         if role.managed:
             raise utils.SpecialError(":point_right: **Error: role **{}** cannot be used as it is managed by an integration!**".format(role.mention))
 
-        search = await self.bot.fetchrow("SELECT * FROM autoroles WHERE message_id = $1", message.id)
+        search = await self.bot.fetchrow(utils.Queries.GetAutorole, message.id)
         if not search:
             raise utils.SpecialError(":point_right: **Error: autorole with role **{}** is not set!**".format(role.mention))
 
@@ -400,7 +401,8 @@ class Admin(commands.Cog):
             except: emoji = None
         
         if len(roles_id) == 1:
-            await self.bot.execute("DELETE FROM autoroles WHERE message_id = $1", message.id)
+            await self.bot.execute(utils.Queries.DeleteAutorole, message.id)
+            self.bot.autoroles.pop(message.id, None)
         else:
             roles_id.pop(count)
             emojis_id.pop(count)
@@ -409,10 +411,8 @@ class Admin(commands.Cog):
             inverses.pop(count)
             msgs.pop(count)
 
-            await self.bot.execute(
-                "UPDATE autoroles SET roles_id = $1, emojis = $2, restrictions = $3, locks = $4::boolean[], inverses = $5::boolean[], msgs_sent = $6::boolean[] WHERE message_id = $7",
-                roles_id, emojis_id, restrictions, locks, inverses, msgs, message.id
-            )
+            await self.bot.execute(utils.Queries.UpdateAutorole, message.id, roles_id, emojis_id, restrictions, locks, inverses, msgs)
+            self.bot.autoroles[message.id] = utils.build_autoroles(roles_id, emojis_id, restrictions, locks, inverses, msgs)
 
         if emoji:
             try: await message.clear_reaction(emoji)
@@ -501,13 +501,14 @@ class Admin(commands.Cog):
             except:
                 raise utils.ConverterNotFoundError("Text Channel")
 
-        result = await self.bot.fetchval("SELECT channel_id FROM logs WHERE server_id = $1", ctx.guild.id)
+        result = await self.bot.get_log_channel_id(ctx.guild.id)
 
         if result is None:
             if not channel:
                 await ctx.send(":point_right: **Logs channel has not been activated on this server!**\nIf you want to activate it, please run the command again by specifing a logs channel.")
                 return
-            await self.bot.execute("INSERT INTO logs(server_id, channel_id) VALUES($1,$2)", ctx.guild.id, channel.id)
+            await self.bot.execute(utils.Queries.InsertLogChannel, ctx.guild.id, channel.id)
+            self.bot.log_channels[ctx.guild.id] = channel.id
             
             if channel.id == ctx.channel.id:
                 await ctx.send(utils.CustomEmojis.GreenCheck + " **Logs has been successfully activated on this server!**\nThis channel is the log channel!")
@@ -515,14 +516,16 @@ class Admin(commands.Cog):
             await ctx.send(utils.CustomEmojis.GreenCheck + " **Logs has been activated on this server!**\nLogs channel: {}".format(channel.mention))
             return
 
-        logschannels = self.bot.get_channel(result[0])
+        logschannels = ctx.guild.get_channel(result)
         if logschannels is None:
             if not channel:
-                await self.bot.execute("DELETE FROM logs WHERE server_id = $1", ctx.guild.id)
+                await self.bot.execute(utils.Queries.DeleteLogChannel, ctx.guild.id)
+                self.bot.log_channels[ctx.guild.id] = None
                 await ctx.send(":point_right: **Logs channel has not been activated on this server!**\nIf you want to activate it, please run the command again by specifing a logs channel.")
                 return
             
-            await self.bot.execute("UPDATE logs SET channel_id = $1 WHERE server_id = $2", channel.id, ctx.guild.id)
+            await self.bot.execute(utils.Queries.UpdateLogChannel, ctx.guild.id, channel.id)
+            self.bot.log_channels[ctx.guild.id] = channel.id
             if channel.id == ctx.channel.id:
                 await ctx.send(utils.CustomEmojis.GreenCheck + " **Logs has been successfully activated on this server!**\nThis channel is the log channel!")
                 return
@@ -530,30 +533,30 @@ class Admin(commands.Cog):
             return
 
         if not channel:
-            if result[0] == ctx.channel.id:
+            if result == ctx.channel.id:
                 await ctx.send(":point_right: **Logs has been activated on this channel!**")
                 return
             await ctx.send(":point_right: **Logs has been activated in **{}**!**".format(logschannels.mention))
             return
 
-        if channel.id == ctx.channel.id:
+        if channel.id == result:
             await ctx.send(":point_right: **Logs has already been activated on this channel!**")
             return
 
-        await self.bot.execute("UPDATE logs SET channel_id = $1 WHERE server_id = $2", channel.id, ctx.guild.id)
+        await self.bot.execute(utils.Queries.UpdateLogChannel, ctx.guild.id, channel.id)
+        self.bot.log_channels[ctx.guild.id] = channel.id
         await ctx.send(utils.CustomEmojis.GreenCheck + " **The logs channel has successfully been replaced with: **{}".format(channel.mention))
 
     @commands.command(aliases=["activate", "activatepremium", "premiumactivate"])
     @commands.has_guild_permissions(manage_guild=True)
     @utils.set_cooldown(per=30.0, alter_per=30.0)
     async def upgrade(self, ctx, code: str = None):
-        data = await self.bot.fetchval("SELECT server_id FROM premiumservers WHERE server_id = $1", ctx.guild.id)
-        if data is not None:
+        if ctx.guild.id in self.bot.premium_guilds:
             raise utils.SpecialError(":point_right: **This server is already a premium server!**\n:blush: Thank you for your support!")
 
         if ctx.author.id in self.bot.developers:
-            await self.bot.execute("INSERT INTO premiumservers(server_id, donator_id) VALUES($1,$2)", ctx.guild.id, ctx.author.id)
-            
+            await self.bot.execute(utils.Queries.InsertPremiumServer, ctx.guild.id, ctx.author.id)
+            self.bot.premium_guilds.add(ctx.guild.id)
             await ctx.send("{} **This server is now a premium guild!**".format(utils.CustomEmojis.GreenCheck))
             return
         
@@ -567,8 +570,8 @@ class Admin(commands.Cog):
             await self.bot.execute("DELETE FROM premiumcodes WHERE code = $1", code)
             raise utils.SpecialError("{} **Premium access denied: code has not be found!**\nIf this is unusual, please contact a bot developer.**".format(utils.CustomEmojis.RedCross))
 
-        await self.bot.execute("INSERT INTO premiumservers(server_id, donator_id) VALUES($1,$2)", ctx.guild.id, res.get("creator"))
-        
+        await self.bot.execute(utils.Queries.InsertPremiumServer, ctx.guild.id, res.get("creator"))
+        self.bot.premium_guilds.add(ctx.guild.id)
 
         num = res.get("allowed") - 1
         if num:
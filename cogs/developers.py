@@ -142,11 +142,11 @@ class Developers(commands.Cog):
         if guild_id in (self.bot.support_guild, self.bot.dev_guild):
             raise utils.SpecialError(":point_right: **Error: cannot remove premium on a special guild!**")
         
-        res = await self.bot.fetchval("SELECT server_id FROM premiumservers WHERE server_id = $1", guild_id)
-        if res is None:
+        if guild_id not in self.bot.premium_guilds:
             raise utils.SpecialError(":point_right: **Error: server is not premium!**")
 
-        await self.bot.execute("DELETE FROM premiumservers WHERE server_id = $1", guild_id)
+        await self.bot.execute(utils.Queries.DeletePremiumServer, guild_id)
+        self.bot.premium_guilds.discard(guild_id)
         await ctx.send("{} Successfully removed server **{}** from premium guilds.".format(utils.CustomEmojis.GreenCheck, server.name))
 
 
@@ -155,6 +155,32 @@ class Developers(commands.Cog):
         pass
 
 
+    @commands.command(aliases=["querystatistics", "dbstats"])
+    async def querystats(self, ctx, *, command: str = None):
+        metrics = self.bot.query_metrics
+        if command is None:
+            items = metrics.most_expensive()
+        else:
+            command = command.lower()
+            items = [(name, stats) for name, stats in metrics.commands.items() if name.lstrip("/") == command.lstrip("/")]
+        if not items:
+            raise utils.SpecialError(":point_right: **No query statistics recorded yet!**" if command is None else ":point_right: **No query statistics recorded for command {}!**".format(command))
+
+        embed = discord.Embed(title="Query statistics", description="Database round trips per invocation since startup.", colour=utils.random_colour())
+        for name, stats in items:
+            embed.add_field(
+                name=name,
+                value="- **Invocations**: {:,}\n- **Queries**: {:.1f} on average, {} at most\n- **Database time**: {:.1f} ms on average".format(
+                    stats.invocations, stats.average_queries, stats.max_queries, stats.average_time*1000
+                ),
+                inline=False
+            )
+        dropped = self.bot.log_dispatcher.dropped
+        if dropped:
+            embed.set_footer(text="{:,} log entries dropped in {:,} servers since startup".format(sum(dropped.values()), len(dropped)))
+        await ctx.send(embed=embed)
+
+
     @commands.command(aliases=["serverleave"])
     async def leaveserver(self, ctx, *, server: str = None):
         if server is None:
@@ -196,9 +222,9 @@ class Developers(commands.Cog):
             return
 
         # Blacklist user
-        result = await self.bot.fetchval("SELECT user_id FROM blacklistedusers WHERE user_id = $1", target_id)
-        if result is None:
-            await self.bot.execute("INSERT INTO blacklistedusers(user_id) VALUES ($1)", target_id)
+        if target_id not in self.bot.blacklisted_users:
+            await self.bot.execute(utils.Queries.InsertBlacklistedUser, target_id)
+            self.bot.blacklisted_users.add(target_id)
             await ctx.send("{} Successfully blacklisted user **{}**!".format(utils.CustomEmojis.GreenCheck, str(target)))
             return
         
@@ -221,9 +247,9 @@ class Developers(commands.Cog):
             return
 
         # Blacklist server
-        result = await self.bot.fetchval("SELECT server_id FROM blacklistedservers WHERE server_id = $1", server_id)
-        if result is None:
-            await self.bot.execute("INSERT INTO blacklistedservers(server_id) VALUES ($1)", server_id)
+        if server_id not in self.bot.blacklisted_guilds:
+            await self.bot.execute(utils.Queries.InsertBlacklistedServer, server_id)
+            self.bot.blacklisted_guilds.add(server_id)
             await ctx.send("{} Successfully blacklisted server **{}**!".format(utils.CustomEmojis.GreenCheck, server.name))
             return
         
@@ -4,8 +4,7 @@ import discord
 from discord.ext import commands
 import asyncio
 import string
-from random import randint, choice
-import json
+from random import randint, randrange, choice
 import math
 from discord_slash import cog_ext
 from discord_slash.context import SlashContext
@@ -57,7 +56,7 @@ class Fun(commands.Cog):
 
         amountstr = utils.number_format(amount)
         try:
-            await self.bot.removemoney(ctx.author, amount)
+            await self.bot.removemoney(ctx.author, amount, reason="roulette")
         except ValueError:
             await ctx.send(":point_right: You cannot bet {}**{}**, as you don't have that much in your balance!".format(utils.CustomEmojis.Smilo, amountstr))
             raise utils.SilentError
@@ -97,11 +96,11 @@ class Fun(commands.Cog):
         if win:
             if multiplier == 2:
                 await message.edit(content=":clap: **Congradulations!** You bet on **{}** and the roll was **{}**.\nYou won {}**{}**.".format(bet, roll, utils.CustomEmojis.Smilo, amountstr))
-                await self.bot.addmoney(ctx.author, amount*2)
+                await self.bot.addmoney(ctx.author, amount*2, reason="roulette")
                 return
             
             await message.edit(content=":clap: **Congradulations!** You bet on **{}** and the roll was exactly what you predicted!\nYou won {}**{}**.".format(bet, utils.CustomEmojis.Smilo, utils.number_format(amount*35)))
-            await self.bot.addmoney(ctx.author, amount*36)
+            await self.bot.addmoney(ctx.author, amount*36, reason="roulette")
             if roll:
                 return
             
@@ -210,12 +209,11 @@ class Fun(commands.Cog):
             raise utils.SilentError
 
         try:
-            curr_amount = await self.bot.removemoney(ctx.author, amount)
+            await self.bot.transfermoney(ctx.author, user, amountgiven, tax=tax)
         except ValueError:
             await output.edit(content=":point_right: **Error: amount exceeds what you have in your balance!**", embed=None, components=[])
-        
+            raise utils.SilentError
 
-        await self.bot.addmoney(user, amountgiven)
         await output.edit(content="{} Successfully transfered {}**{}** to {}!".format(utils.CustomEmojis.GreenCheck, utils.CustomEmojis.Smilo, utils.number_format(amountgiven), user.mention), embed=None, components=[])
     
     @commands.command()
@@ -387,9 +385,7 @@ class Fun(commands.Cog):
                 await ctx.send(":point_right: **Achievements are disabled for {}, as this user is a bot user!**".format(user.mention))
                 return
             
-            allowed = await self.bot.fetchval("SELECT achievements FROM privacysettings WHERE user_id = $1", user.id)
-            if allowed is None:
-                allowed = True
+            allowed = (await self.bot.get_user_state(ctx, user)).public_achievements
             
             if ctx.author.id not in utils.bot_developers and not allowed:
                 await ctx.send(":lock: **You do not have permission to view the achievements of {}.**".format(user.mention))
@@ -399,47 +395,54 @@ class Fun(commands.Cog):
         number_of_pages = math.ceil(len_achvs / 10)
 
         page = 1
-        with open(utils.Files.Achievements) as a:
-            achievements = json.load(a)
+        achievements = utils.resources.achievements
         
         msg = None
         randomcolour = utils.random_colour()
+        embeds = {} # Page -> rendered embed, kept until the refresh button is pressed
 
         while True:
-            achvs = tuple(range((page-1)*10, page*10))
-            counter = 0
-            fields = []
-
-            for index, (achievement, progress, search) in enumerate(utils.achievements):
-                dic = achievements[achievement]
-                result = await self.bot.fetchval(f"SELECT {search} FROM users WHERE id = $1", user.id)
-                if progress:
-                    if result is None:
+            if not embeds:
+                # The state fetched for the privacy check is reused for the first page
+                row = (await self.bot.get_user_state(ctx, user, refresh=msg is not None)).user
+
+            embed = embeds.get(page)
+            if embed is None:
+                achvs = tuple(range((page-1)*10, page*10))
+                counter = 0
+                fields = []
+
+                for index, (achievement, progress, search) in enumerate(utils.achievements):
+                    dic = achievements[achievement]
+                    result = None if row is None else row[search]
+                    if progress:
+                        if result is None:
+                            if index in achvs:
+                                fields.append(self.bot.achievement(achievement, dic, unlocked=False, progress=(0, progress)))
+                            continue
+                        if result < progress:
+                            if index in achvs:
+                                fields.append(self.bot.achievement(achievement, dic, unlocked=False, progress=(result, progress)))
+                            continue
+                        counter += 1
                         if index in achvs:
-                            fields.append(self.bot.achievement(achievement, dic, unlocked=False, progress=(0, progress)))
+                            fields.append(self.bot.achievement(achievement, dic, unlocked=True))
                         continue
-                    if result < progress:
+
+                    if not result:
                         if index in achvs:
-                            fields.append(self.bot.achievement(achievement, dic, unlocked=False, progress=(result, progress)))
+                            fields.append(self.bot.achievement(achievement, dic, unlocked=False))
                         continue
                     counter += 1
                     if index in achvs:
                         fields.append(self.bot.achievement(achievement, dic, unlocked=True))
-                    continue
-
-                if not result:
-                    if index in achvs:
-                        fields.append(self.bot.achievement(achievement, dic, unlocked=False))
-                    continue
-                counter += 1
-                if index in achvs:
-                    fields.append(self.bot.achievement(achievement, dic, unlocked=True))
 
-            embed = discord.Embed(title="Achievements", description="{}/{} achievements unlocked.".format(counter, len_achvs), colour=randomcolour)
-            embed.set_author(name=str(user), icon_url=user.avatar_url)
-            for field in fields:
-                embed.add_field(name=field[0], value=field[1], inline=False)
-            embed.set_footer(text="Page {}/{}".format(page, number_of_pages))
+                embed = discord.Embed(title="Achievements", description="{}/{} achievements unlocked.".format(counter, len_achvs), colour=randomcolour)
+                embed.set_author(name=str(user), icon_url=user.avatar_url)
+                for field in fields:
+                    embed.add_field(name=field[0], value=field[1], inline=False)
+                embed.set_footer(text="Page {}/{}".format(page, number_of_pages))
+                embeds[page] = embed
 
             action_row = create_actionrow(
                 create_button(emoji="⏮", style=ButtonStyle.blue, custom_id="firstpage", disabled=(page<=1)),
@@ -476,6 +479,8 @@ class Fun(commands.Cog):
                 page += 1
             elif userchoice == "lastpage":
                 page = number_of_pages
+            elif userchoice == "refresh":
+                embeds.clear()
 
 
     @cog_ext.cog_slash(name="cat", description="Get a random cat.")
@@ -551,10 +556,9 @@ class Fun(commands.Cog):
 
     @cog_ext.cog_slash(name="joke", description="Get a random joke.")
     async def joke(self, ctx: SlashContext):
-        with open(utils.Files.Jokes) as f:
-            content = json.load(f)
-        randomchoice = choice(content)
-        await ctx.send("__**Joke #{}**__:\n".format(content.index(randomchoice)+1) + randomchoice)
+        jokes = utils.resources.jokes
+        index = randrange(len(jokes))
+        await ctx.send("__**Joke #{}**__:\n".format(index+1) + jokes[index])
 
     @commands.command()
     @commands.guild_only()
@@ -594,15 +598,13 @@ class Fun(commands.Cog):
                 await ctx.send(":point_right: **Balance is disabled for {}, as this user is a bot user!**".format(user.mention))
                 return
             
-            allowed = await self.bot.fetchval("SELECT balance FROM privacysettings WHERE user_id = $1", user.id)
-            if allowed is None:
-                allowed = True
+            allowed = (await self.bot.get_user_state(ctx, user)).public_balance
             
             if ctx.author.id not in utils.bot_developers and not allowed:
                 await ctx.send(":lock: **You do not have permission to view the balance of {}.**".format(user.mention))
                 raise utils.SilentError
 
-        amount = await self.bot.fetchval("SELECT money FROM users WHERE id = $1", user.id)
+        amount = (await self.bot.get_user_state(ctx, user)).money
         if not amount:
             if user == ctx.author:
                 await ctx.send(f"{utils.CustomEmojis.SmiloMoney} **You don't have any money right now!**")
@@ -614,6 +616,47 @@ class Fun(commands.Cog):
             return
         await ctx.send("{} {} has an amount of {}**{}**.".format(utils.CustomEmojis.SmiloMoney, user.mention, utils.CustomEmojis.Smilo, utils.number_format(amount)))
 
+    @cog_ext.cog_slash(
+        name="rank",
+        description="Displays a user's rank based on their wealth.",
+        options=[
+            create_option(
+                name="user",
+                description="User to get rank from.",
+                required=False,
+                option_type=Options.USER
+            )
+        ]
+    )
+    async def rank(self, ctx: SlashContext, user: discord.Member = None):
+        if user is None: user = ctx.author
+        
+        if ctx.author != user:
+            if user == self.bot.user:
+                await ctx.send(":point_right: **Rank is disabled for me!**")
+                return
+            if user.bot:
+                await ctx.send(":point_right: **Rank is disabled for {}, as this user is a bot user!**".format(user.mention))
+                return
+            
+            allowed = (await self.bot.get_user_state(ctx, user)).public_balance
+            
+            if ctx.author.id not in utils.bot_developers and not allowed:
+                await ctx.send(":lock: **You do not have permission to view the rank of {}.**".format(user.mention))
+                raise utils.SilentError
+
+        if not self.bot.ranks.get(user.id):
+            if user == ctx.author:
+                await ctx.send(":point_right: **You are not ranked as you don't have any money right now!**")
+                return
+            await ctx.send(":point_right: **{} is not ranked as this user doesn't have any money right now!**".format(user.mention))
+            return
+        rank = self.bot.ranks.rank(user.id)
+        if user == ctx.author:
+            await ctx.send(":trophy: You are ranked **#{:,}** out of **{:,}** players.".format(rank, self.bot.ranks.ranked))
+            return
+        await ctx.send(":trophy: {} is ranked **#{:,}** out of **{:,}** players.".format(user.mention, rank, self.bot.ranks.ranked))
+
     @commands.command()
     @utils.set_cooldown()
     async def shop(self, ctx):
@@ -626,7 +669,7 @@ class Fun(commands.Cog):
     @commands.command()
     @utils.set_cooldown(per=86400, alter_per=86400)
     async def daily(self, ctx):
-        await self.bot.addmoney(ctx.author, 200)
+        await self.bot.addmoney(ctx.author, 200, reason="daily")
         await ctx.send(f"{utils.CustomEmojis.GreenCheck} {ctx.author.mention}, you have successfully claimed your daily {utils.CustomEmojis.Smilo}**200**!")
 
     @commands.command(aliases=["currinfo", "infocurr", "infocurrency"])
@@ -637,11 +680,11 @@ class Fun(commands.Cog):
         gdp = await self.bot.get_global_gdp()
         embed.add_field(name="Total GDP", value=f"{utils.CustomEmojis.Smilo} {gdp:,}", inline=False)
         embed.add_field(name="GDP Per Capita", value=f"{utils.CustomEmojis.Smilo} {round(gdp/len(tuple(user for user in self.bot.users if not user.bot))):,}", inline=False)
-        wallet = await self.bot.fetchval("SELECT money FROM users WHERE id = $1", ctx.author.id)
+        wallet = self.bot.ranks.get(ctx.author.id)
         if wallet is None:
             wallet = 0
         embed.add_field(name="My Balance", value=f"{utils.CustomEmojis.Smilo} {wallet:,}", inline=False)
-        mil = await self.bot.fetchval("SELECT COUNT(money) FROM users WHERE money > 999999")
+        mil = self.bot.ranks.millionaires
         embed.add_field(name="Millionaires", value=f"{mil:,}", inline=False)
         await ctx.send(embed=embed)
 
@@ -736,7 +779,7 @@ class Fun(commands.Cog):
                 try: await announce.edit(content="{} **{} has successfully passed the c0d3br34k3r challenge!**".format(utils.CustomEmojis.GreenCheck, ctx.author.mention))
                 finally: return
             if result is None:
-                await self.bot.addline(ctx.author.id, codebreaker=1)
+                await self.bot.addline(ctx.author.id, codebreaker=True)
             else:
                 await self.bot.execute("UPDATE users SET codebreaker = true WHERE id = $1", ctx.author.id)
                 
@@ -756,7 +799,6 @@ class Fun(commands.Cog):
         try: await announce.edit(content="{} **{} has failed to pass the c0d3br34k3r challenge!**".format(utils.CustomEmojis.RedCross, ctx.author.mention))
         finally: return
 
-    """
     @cog_ext.cog_slash(
         name="leaderboard",
         description="Top 100 players based on their wealth."
@@ -764,65 +806,45 @@ class Fun(commands.Cog):
     async def leaderboard(self, ctx: SlashContext):
         page = 1
         msg = None
-        will_break = False
         colour = utils.random_colour()
-        
-        while True:
-            if will_break:
-                break
-
-            alls = await self.bot.fetch(
-                "SELECT id, money, RANK() OVER (ORDER BY money DESC) FROM users LIMIT 100"
-            )
-
-            # WHERE (money > 0) LIMIT 100
-            # money > 0 AND COALESCE((SELECT balance FROM privacysettings WHERE user_id = id), true) = true
+        leaderboard = self.bot.leaderboard
+        embeds = {} # Page -> rendered embed, kept until the refresh button is pressed
 
-            number_of_pages = math.ceil(len(alls)/10)
+        while True:
+            number_of_pages = math.ceil(len(leaderboard)/10)
 
             if page > number_of_pages:
                 raise utils.SpecialError(":point_right: **Page {} of the leaderboard is currently empty.**".format(page))
             
-            result = alls[(page-1)*10:page*10]
-            
-            embed = discord.Embed(
-                title="Leaderboard",
-                description="Here is the leaderboard of the 100 players based on their wealth.",
-                colour=colour
-            )
-            embed.set_author(name=str(ctx.author), icon_url=ctx.author.avatar_url)
-            embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/610761240289214464.png")
-
-            for record in result:
-                user_id, amount, rank = tuple(record.values())
-                try:
-                    user = await self.bot.fetch_user(user_id)
-                    username = str(user)
-                except discord.NotFound:
-                    user = None
-                    username = "Deleted User"
-                except:
-                    user = None
-                    username = "Unknown User"
-                
-                if user is not None:
-                    allowed = await self.bot.fetchval("SELECT balance FROM privacysettings WHERE user_id = $1", user_id)
-                    username = str(user) if (allowed is None or allowed) else "Mystery User"
-                
-                if rank == 1:
-                    rankstr = ":first_place:"
-                elif rank == 2:
-                    rankstr = ":second_place:"
-                elif rank == 3:
-                    rankstr = ":third_place:"
-                else:
-                    rankstr = "**"+str(rank)+"**"
-                
-                embed.add_field(
-                    name="\u200b\n"+username,
-                    value="- **Rank**: " + rankstr + f"\n- **Balance**: {utils.CustomEmojis.Smilo}**{amount:,}**",
-                    inline=False
+            embed = embeds.get(page)
+            if embed is None:
+                embed = discord.Embed(
+                    title="Leaderboard",
+                    description="Here is the leaderboard of the 100 players based on their wealth.",
+                    colour=colour,
+                    timestamp=self.bot.leaderboard_time
                 )
+                embed.set_author(name=str(ctx.author), icon_url=ctx.author.avatar_url)
+                embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/610761240289214464.png")
+
+                for username, amount, rank in leaderboard[(page-1)*10:page*10]:
+                    if rank == 1:
+                        rankstr = ":first_place:"
+                    elif rank == 2:
+                        rankstr = ":second_place:"
+                    elif rank == 3:
+                        rankstr = ":third_place:"
+                    else:
+                        rankstr = "**"+str(rank)+"**"
+                    
+                    embed.add_field(
+                        name="\u200b\n"+username,
+                        value="- **Rank**: " + rankstr + f"\n- **Balance**: {utils.CustomEmojis.Smilo}**{amount:,}**",
+                        inline=False
+                    )
+                position = self.bot.ranks.rank(ctx.author.id) if self.bot.ranks.get(ctx.author.id) else None
+                embed.set_footer(text="Page {}/{} • {} • Last updated".format(page, number_of_pages, "Unranked" if position is None else "Your position: #{:,}".format(position)))
+                embeds[page] = embed
             
             action_row = create_actionrow(
                 create_button(emoji="⏮", style=ButtonStyle.blue, custom_id="firstpage", disabled=(page<=1)),
@@ -846,7 +868,7 @@ class Fun(commands.Cog):
                     check=lambda i: i.author == ctx.author
                 )
             except asyncio.TimeoutError:
-                await button_ctx.edit_origin(components=[])
+                await msg.edit(embed=embed, components=[])
                 return
             
             userchoice = button_ctx.custom_id
@@ -859,7 +881,9 @@ class Fun(commands.Cog):
                 page += 1
             elif userchoice == "lastpage":
                 page = number_of_pages
-    """
+            elif userchoice == "refresh":
+                leaderboard = self.bot.leaderboard
+                embeds.clear()
 
 
     @cog_ext.cog_slash(name="useless", description="Completely useless command.")
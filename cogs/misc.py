@@ -545,7 +545,7 @@ class Misc(commands.Cog):
     @commands.command(aliases=["requestinfos", "storedinfos", "mydata", "requestdata", "storeddata"])
     @utils.set_cooldown(per=3600, alter_per=2400)
     async def myinfos(self, ctx):
-        result = await self.bot.fetchrow("SELECT * FROM users WHERE id = $1", ctx.author.id)
+        result = (await self.bot.get_user_state(ctx, ctx.author)).user
         if result is None:
             await ctx.send(":point_right: **No informations has been stored on you!**")
             return
@@ -588,15 +588,15 @@ class Misc(commands.Cog):
         
         await utils.ask_confirmation(ctx=ctx, bot=self.bot, embed=embed)
         
-        users_table = await self.bot.fetchrow("SELECT * FROM users WHERE id = $1", ctx.author.id)
-        privacy_table = await self.bot.fetchrow("SELECT * FROM privacysettings WHERE user_id = $1", ctx.author.id)
+        users_table, privacy_table = await self.bot.get_user_state(ctx, ctx.author)
         if users_table is None and privacy_table is None:
             await ctx.send(":point_right: **No informations has been stored on you!**")
             return
         if users_table is not None:
-            await self.bot.execute("DELETE FROM users WHERE id = $1", ctx.author.id)
+            await self.bot.execute(utils.Queries.DeleteUser, ctx.author.id)
+            self.bot.ranks.remove(ctx.author.id)
         if privacy_table is not None:
-            await self.bot.execute("DELETE FROM privacysettings WHERE user_id = $1", ctx.author.id)
+            await self.bot.execute(utils.Queries.DeletePrivacySettings, ctx.author.id)
         
         await ctx.send(utils.CustomEmojis.GreenCheck + " **Successfully cleared all your informations in the database.**")
         raise utils.SilentError
@@ -1043,7 +1043,7 @@ class Misc(commands.Cog):
     @commands.group(aliases=["privacysettings", "settingsprivacy"], invoke_without_command=True, case_insensitive=True)
     @utils.set_cooldown()
     async def privacy(self, ctx):
-        query = await self.bot.fetchrow("SELECT * FROM privacysettings WHERE user_id = $1", ctx.author.id)
+        query = await self.bot.fetchrow(utils.Queries.GetPrivacySettings, ctx.author.id)
         if query is None:
             elems = [("balance", True), ("achievements", True)]
         else:
@@ -1076,32 +1076,32 @@ class Misc(commands.Cog):
             else:
                 raise utils.SpecialError(":point_right: **Error: option {} unknown.**".format(option.lower()))
         
-        query = await self.bot.fetchrow("SELECT * FROM privacysettings WHERE user_id = $1", ctx.author.id)
+        query = await self.bot.fetchrow(utils.Queries.GetPrivacySettings, ctx.author.id)
         if query is None:
-            allops = {"balance": "true", "achievements": "true"}
+            allops = {"balance": True, "achievements": True}
         else:
-            allops = {key: "true" if value else "false" for key, value in tuple(query.items())[1:]}
+            allops = {key: bool(value) for key, value in tuple(query.items())[1:]}
 
         for option in addups:
-            allops[option] = "true"
+            allops[option] = True
         
-        all_public = all(value == "true" for _, value in allops.items())
+        all_public = all(allops.values())
         final_msg = "{} **Changes have been made!**".format(utils.CustomEmojis.GreenCheck)
 
         if query is None:
             if all_public:
                 await ctx.send(final_msg)
                 return
-            await self.bot.execute(f"INSERT INTO privacysettings(user_id,balance,achievements) VALUES ($1,{allops['balance']},{allops['achievements']})", ctx.author.id)
+            await self.bot.execute(utils.Queries.InsertPrivacySettings, ctx.author.id, allops["balance"], allops["achievements"])
             await ctx.send(final_msg)
             return
         
         if all_public:
-            await self.bot.execute("DELETE FROM privacysettings WHERE user_id = $1", ctx.author.id)
+            await self.bot.execute(utils.Queries.DeletePrivacySettings, ctx.author.id)
             await ctx.send(final_msg)
             return
         
-        await self.bot.execute(f"UPDATE privacysettings SET balance = {allops['balance']}, achievements = {allops['achievements']} WHERE user_id = $1", ctx.author.id)
+        await self.bot.execute(utils.Queries.UpdatePrivacySettings, ctx.author.id, allops["balance"], allops["achievements"])
         await ctx.send(final_msg)
     
     @privacy.command(name="private", aliases=["makeprivate", "privatemake"])
@@ -1119,23 +1119,23 @@ class Misc(commands.Cog):
             else:
                 raise utils.SpecialError(":point_right: **Error: option {} unknown.**".format(option.lower()))
         
-        query = await self.bot.fetchrow("SELECT * FROM privacysettings WHERE user_id = $1", ctx.author.id)
+        query = await self.bot.fetchrow(utils.Queries.GetPrivacySettings, ctx.author.id)
         if query is None:
-            allops = {"balance": "true", "achievements": "true"}
+            allops = {"balance": True, "achievements": True}
         else:
-            allops = {key: "true" if value else "false" for key, value in tuple(query.items())[1:]}
+            allops = {key: bool(value) for key, value in tuple(query.items())[1:]}
 
         for option in addups:
-            allops[option] = "false"
+            allops[option] = False
         
         final_msg = "{} **Changes have been made!**".format(utils.CustomEmojis.GreenCheck)
 
         if query is None:
-            await self.bot.execute(f"INSERT INTO privacysettings(user_id,balance,achievements) VALUES ($1,{allops['balance']},{allops['achievements']})", ctx.author.id)
+            await self.bot.execute(utils.Queries.InsertPrivacySettings, ctx.author.id, allops["balance"], allops["achievements"])
             await ctx.send(final_msg)
             return
         
-        await self.bot.execute(f"UPDATE privacysettings SET balance = {allops['balance']}, achievements = {allops['achievements']} WHERE user_id = $1", ctx.author.id)
+        await self.bot.execute(utils.Queries.UpdatePrivacySettings, ctx.author.id, allops["balance"], allops["achievements"])
         await ctx.send(final_msg)
 
 
@@ -1,7 +1,10 @@
 """Utilities for the bot."""
 
+from .autoroles import *
+from .cache import *
 from .checks import *
 from .data import *
+from .delivery import *
 from .parser import (
     __version__ as parser_version,
     BriskParser,
@@ -9,6 +12,11 @@ from .parser import (
     SilentException
 )
 from .functions import *
+from .metrics import *
+from .queries import *
+from .ranking import *
+from .resources import *
+from .state import *
 from .errors import *
 
-# from . import checks, data, errors, functions, parser
+# from . import autoroles, cache, checks, data, delivery, errors, functions, metrics, parser, queries, ranking, resources, state
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import namedtuple
+import discord
+from .data import CustomEmojis
+
+__all__ = (
+    "Autorole",
+    "build_autoroles",
+    "RoleCoalescer"
+)
+
+
+Autorole = namedtuple("Autorole", ("role_id", "restriction_id", "locked", "inversed", "send_dm"))
+
+
+def build_autoroles(roles_id, emojis_id, restrictions, locks, inverses, msgs):
+    """Returns the emoji ID -> `Autorole` mapping of a message from the columns of its `autoroles` row."""
+    return {
+        emoji_id: Autorole(role_id, restriction_id, locked, inversed, send_dm)
+        for role_id, emoji_id, restriction_id, locked, inversed, send_dm in zip(roles_id, emojis_id, restrictions, locks, inverses, msgs)
+    }
+
+
+class RoleCoalescer:
+    """Collects the autorole changes requested for a member during `delay` seconds and applies their net result with a single edit.
+    Only the last change requested for each role counts, and a DM is sent only for roles which were actually given or removed."""
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self._pending = {} # (guild ID, member ID) -> (latest member object, {role ID -> (role, add, send_dm)})
+        self._tasks = {} # (guild ID, member ID) -> task applying the changes
+
+    def request(self, member, role, add, send_dm=False):
+        """Requests `role` to be given to `member` if `add` is `True`, else to be removed from them."""
+        key = (member.guild.id, member.id)
+        changes = self._pending[key][1] if key in self._pending else {}
+        changes[role.id] = (role, add, send_dm)
+        self._pending[key] = (member, changes)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.get_event_loop().create_task(self._apply(key))
+
+    async def _apply(self, key):
+        """Applies the changes collected for a member once the delay has elapsed."""
+        await asyncio.sleep(self.delay)
+        # Changes requested from now on are applied by the next task
+        self._tasks.pop(key, None)
+        member, changes = self._pending.pop(key)
+        # Prefer the cached member, whose roles are kept up to date by the gateway
+        member = member.guild.get_member(member.id) or member
+
+        roles = {role.id: role for role in member.roles if not role.is_default()}
+        applied = []
+        for role, add, send_dm in changes.values():
+            if add == (role.id in roles):
+                continue
+            if add:
+                roles[role.id] = role
+            else:
+                del roles[role.id]
+            applied.append((role, add, send_dm))
+        if not applied:
+            return
+
+        try: await member.edit(roles=list(roles.values()), reason="Autorole")
+        except discord.HTTPException: return
+
+        for role, add, send_dm in applied:
+            if not send_dm:
+                continue
+            try: await member.send("{} I successfully {} the role **{}**{}".format(CustomEmojis.GreenCheck, ("gave you" if add else "removed"), role.name, ("." if add else " from you.")))
+            except discord.HTTPException: return
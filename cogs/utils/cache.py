@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import OrderedDict
+
+__all__ = (
+    "MISSING",
+    "LRUCache",
+    "SingleFlight"
+)
+
+
+# Sentinel to tell apart a missing entry from a cached `None` (negative entry)
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping which evicts its least recently used entries once `maxsize` is reached."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """Returns the value associated with `key` and marks it as recently used, else returns `default`."""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def pop(self, key, default=None):
+        """Removes `key` from the cache and returns its value, else returns `default`."""
+        return self._data.pop(key, default)
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        self._data.clear()
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls: while a call for a key is running, other callers with the same key wait for its result instead of running it again."""
+
+    def __init__(self):
+        self._calls = {} # Key -> future of the running call
+
+    async def do(self, key, func, *args):
+        """Returns the result of `func(*args)`, sharing the call with the other callers of `key`."""
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func(*args))
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded so that a cancelled caller does not cancel the call for the others
+        return await asyncio.shield(future)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import Counter, deque
+import time
+import discord
+from .data import EmbedColours
+
+__all__ = (
+    "LogDispatcher",
+)
+
+
+MAX_EMBEDS = 10 # Per message
+MAX_EMBEDS_SIZE = 6000 # Total number of characters per message
+
+
+class LogDispatcher:
+    """Delivers log embeds in batches. Embeds posted to a channel within `delay` seconds are sent together, up to 10 per message,
+    through a webhook managed by the bot when it has the permission to create one. Otherwise each embed is sent as its own message.
+    At most `max_messages` messages are sent per channel and per batch, and at most `max_pending` embeds can wait for a channel.
+    Channels which cannot use a webhook are checked again after `webhook_retry` seconds.
+    Embeds posted beyond that limit, or lost because a delivery failed, are dropped, counted in `dropped` and logged."""
+
+    webhook_name = "Brisk Logs"
+
+    def __init__(self, bot, delay=2.0, max_messages=2, max_pending=100, webhook_retry=600.0):
+        self.bot = bot
+        self.delay = delay
+        self.max_messages = max_messages
+        self.max_pending = max_pending
+        self.webhook_retry = webhook_retry
+        self.dropped = Counter() # Guild ID -> number of dropped embeds
+        self._queues = {} # Channel ID -> embeds waiting to be sent
+        self._unreported = Counter() # Channel ID -> number of dropped embeds not yet reported in the channel
+        self._tasks = {} # Channel ID -> delivery task
+        self._webhooks = {} # Channel ID -> webhook
+        self._webhook_checks = {} # Channel ID -> time from which a channel which cannot use a webhook is checked again
+
+    def post(self, channel, embed):
+        """Queues `embed` to be sent to `channel`."""
+        queue = self._queues.setdefault(channel.id, deque())
+        if len(queue) >= self.max_pending:
+            if not self._unreported[channel.id]:
+                self.bot.logger.warning("Log queue of channel %s is full, log entries are dropped", channel.id)
+            self.dropped[channel.guild.id] += 1
+            self._unreported[channel.id] += 1
+            return
+        queue.append(embed)
+        if channel.id not in self._tasks:
+            self._tasks[channel.id] = asyncio.get_event_loop().create_task(self._deliver(channel))
+
+    def forget(self, channel_id):
+        """Discards the embeds waiting for a channel and its webhook."""
+        self._queues.pop(channel_id, None)
+        self._unreported.pop(channel_id, None)
+        self._webhooks.pop(channel_id, None)
+        self._webhook_checks.pop(channel_id, None)
+
+    async def _deliver(self, channel):
+        """Sends the embeds queued for `channel` until the queue is empty."""
+        unsent = 0 # Embeds of the current batch not sent yet
+        try:
+            while self._queues.get(channel.id):
+                await asyncio.sleep(self.delay)
+                queue = self._queues.get(channel.id)
+                if not queue:
+                    break
+                unreported = self._unreported.pop(channel.id, 0)
+                if unreported:
+                    # Sent first, within the messages of the batch
+                    queue.appendleft(discord.Embed(
+                        description=":warning: **{} log entries have been dropped due to high activity.**".format(unreported),
+                        colour=EmbedColours.MessageEdition
+                    ))
+                webhook = await self._get_webhook(channel)
+                messages = self._pack(queue, MAX_EMBEDS if webhook is not None else 1)
+                unsent = sum(len(embeds) for embeds in messages)
+                for i, embeds in enumerate(messages):
+                    if not await self._send(channel, embeds, webhook):
+                        # The webhook cannot be used anymore: the rest of the batch waits for the next one, sent one embed per message
+                        for embeds in reversed(messages[i:]):
+                            queue.extendleft(reversed(embeds))
+                        unsent = 0
+                        break
+                    unsent -= len(embeds)
+        except (discord.Forbidden, discord.NotFound):
+            dropped = self._discard(channel, unsent)
+            self.forget(channel.id)
+            if dropped:
+                self.bot.logger.warning("Channel %s cannot receive logs anymore, %s log entries dropped", channel.id, dropped)
+        except Exception:
+            self.bot.logger.exception("Log delivery to channel %s failed, %s log entries dropped", channel.id, self._discard(channel, unsent))
+        finally:
+            self._tasks.pop(channel.id, None)
+            if not self._queues.get(channel.id):
+                self._queues.pop(channel.id, None)
+
+    def _discard(self, channel, unsent):
+        """Drops the embeds queued for `channel` and the `unsent` embeds of its current batch, and returns their number."""
+        dropped = unsent + len(self._queues.pop(channel.id, ()))
+        if dropped:
+            self.dropped[channel.guild.id] += dropped
+        return dropped
+
+    def _pack(self, queue, per_message):
+        """Removes from `queue` the embeds of the next batch and returns them grouped by message, up to `per_message` per message."""
+        messages = []
+        current, size = [], 0
+        while queue and len(messages) < self.max_messages:
+            embed = queue[0]
+            if current and (len(current) == per_message or size + len(embed) > MAX_EMBEDS_SIZE):
+                messages.append(current)
+                current, size = [], 0
+                continue
+            current.append(queue.popleft())
+            size += len(embed)
+        if current:
+            messages.append(current)
+        return messages
+
+    async def _send(self, channel, embeds, webhook):
+        """Sends `embeds` in a single message, through `webhook` if it is not `None`, else as a regular message holding one embed.
+        Returns `False` if the webhook cannot be used anymore, in which case nothing is sent."""
+        if webhook is None:
+            embed, = embeds
+            await channel.send(embed=embed)
+            return True
+        try:
+            await webhook.send(embeds=embeds, username=self.bot.user.name, avatar_url=str(self.bot.user.avatar_url))
+        except (discord.Forbidden, discord.NotFound):
+            # Webhook deleted or permission removed, fall back to regular messages
+            self._webhooks.pop(channel.id, None)
+            self._webhook_checks[channel.id] = time.monotonic() + self.webhook_retry
+            return False
+        return True
+
+    async def _get_webhook(self, channel):
+        """Returns the webhook of the bot in `channel`, creating it if needed, or `None` if it cannot be used."""
+        webhook = self._webhooks.get(channel.id)
+        if webhook is not None or time.monotonic() < self._webhook_checks.get(channel.id, 0):
+            return webhook
+        webhook = None
+        if channel.permissions_for(channel.guild.me).manage_webhooks:
+            try:
+                webhook = discord.utils.find(lambda w: w.name == self.webhook_name and w.user == self.bot.user, await channel.webhooks())
+                if webhook is None:
+                    webhook = await channel.create_webhook(name=self.webhook_name, reason="Logs delivery")
+            except discord.HTTPException:
+                webhook = None
+        if webhook is None:
+            self._webhook_checks[channel.id] = time.monotonic() + self.webhook_retry
+        else:
+            self._webhooks[channel.id] = webhook
+            self._webhook_checks.pop(channel.id, None)
+        return webhook
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+__all__ = (
+    "QueryStats",
+    "QueryMetrics",
+    "track_queries",
+    "count_query",
+    "timed_query",
+    "assert_max_queries"
+)
+
+
+class QueryStats:
+    """Number of queries run and time spent in the database during one command invocation."""
+
+    __slots__ = ("queries", "time")
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+
+class CommandMetrics:
+    """Query statistics aggregated over the invocations of a command."""
+
+    __slots__ = ("invocations", "queries", "time", "max_queries")
+
+    def __init__(self):
+        self.invocations = 0
+        self.queries = 0
+        self.time = 0.0
+        self.max_queries = 0
+
+    @property
+    def average_queries(self):
+        return self.queries / self.invocations
+
+    @property
+    def average_time(self):
+        return self.time / self.invocations
+
+
+class QueryMetrics:
+    """Query statistics of every command invoked since the bot started."""
+
+    def __init__(self):
+        self.commands = {} # Command name -> `CommandMetrics`
+
+    def record(self, name, stats):
+        """Adds the statistics of an invocation of the command `name`."""
+        metrics = self.commands.get(name)
+        if metrics is None:
+            metrics = self.commands[name] = CommandMetrics()
+        metrics.invocations += 1
+        metrics.queries += stats.queries
+        metrics.time += stats.time
+        metrics.max_queries = max(metrics.max_queries, stats.queries)
+
+    def most_expensive(self, limit=10):
+        """Returns the `(name, metrics)` pairs of the `limit` commands running the most queries on average."""
+        return sorted(self.commands.items(), key=lambda item: item[1].average_queries, reverse=True)[:limit]
+
+
+# Statistics of the command being invoked, `None` outside of a command
+current_stats = ContextVar("current_stats", default=None)
+
+
+@contextmanager
+def track_queries():
+    """Counts the queries run in the block, and yields the `QueryStats` holding the count."""
+    stats = QueryStats()
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def count_query(elapsed):
+    """Counts a query which took `elapsed` seconds in the current command, if any."""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.time += elapsed
+
+
+@contextmanager
+def timed_query():
+    """Counts the query run in the block, with the time it takes, in the current command."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        count_query(time.perf_counter() - start)
+
+
+@contextmanager
+def assert_max_queries(maximum):
+    """Raises `AssertionError` if the block runs more than `maximum` queries, to catch round trip regressions in commands."""
+    with track_queries() as stats:
+        yield stats
+    if stats.queries > maximum:
+        raise AssertionError("{} queries were run, expected at most {}".format(stats.queries, maximum))
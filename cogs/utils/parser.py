@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 
-from collections import namedtuple, deque
+from collections import namedtuple, deque, OrderedDict
 from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import partial, total_ordering
 from itertools import groupby
 import math
 import operator
 import random
+import re
 import pyparsing as pp
 import sys
+from types import SimpleNamespace
+import weakref
 from pyparsing import ParseBaseException, ParseException
 
 if not hasattr(ParseException, "explain_exception"):
@@ -37,6 +41,9 @@ pp.ParserElement.enablePackrat()
 
 expressions = {}
 
+# Parser whose session (variables, `ANS`, number of variables) is used by the shared grammar of its class
+_active_session = ContextVar("_active_session")
+
 # keywords
 keywords = {
     k.upper(): pp.Keyword(k)
@@ -51,10 +58,14 @@ TRUE.addParseAction(lambda: True)
 # noinspection PyUnresolvedReferences
 FALSE.addParseAction(lambda: False)
 
-FunctionSpec = namedtuple("FunctionSpec", "method arity")
+FunctionSpec = namedtuple("FunctionSpec", "method arity pure", defaults=(True,))
+CacheInfo = namedtuple("CacheInfo", "hits misses maxsize currsize")
 
 _numeric_type = (int, float, complex)
 
+# Greatest size in bytes of a value computed once and for all when compiling a constant subtree
+_maximum_folded_size = 1024
+
 special_keywords = (
     "CLEAR", "ERASE", "DELETE", "RESET",
     "CLEARALL", "ERASEALL", "DELETEALL", "RESETALL",
@@ -121,34 +132,41 @@ _ne = lambda a, b, eps: (
 )
 
 
-def _compute_structure_depth(s, l, t):
-    stack = deque([(0, t.asList())])
-    max_depth = 0
-    while stack:
-        depth, node = stack.popleft()
-        max_depth = max(max_depth, depth)
-        stack.extend((depth+1, item) for item in node if isinstance(item, list))
-    return max_depth
-
-
-_paren_parser = pp.And([pp.nestedExpr()]).addParseAction(_compute_structure_depth)
-_brace_parser = pp.And([pp.nestedExpr('{', '}')]).addParseAction(_compute_structure_depth)
-
-
-def _get_expression_depth(s):
-    depths = [t[0] for t, s, e in _paren_parser.scanString(s)]
-    if depths:
-        return max(depths)
-    else:
-        return -1
-
-
-def _get_set_depth(s):
-    depths = [t[0] for t, s, e in _brace_parser.scanString(s)]
-    if depths:
-        return max(depths)
-    else:
-        return -1
+_openers = {"(": 0, "{": 1}
+_closers = {")": 0, "}": 1}
+
+
+def _get_depths(s):
+    """Returns the nesting depths of the balanced parentheses and of the balanced braces of an expression, in a single pass.
+    Quoted strings are skipped, and unbalanced brackets are ignored."""
+    depths = [0, 0]
+    # For each kind of bracket, greatest depth of the groups closed inside each group still open
+    stacks = ([], [])
+    i = 0
+    length = len(s)
+    while i < length:
+        char = s[i]
+        if char == '"' or char == "'":
+            j = i + 1
+            while j < length and s[j] != char:
+                j += 2 if s[j] == "\\" else 1
+            if j >= length:
+                # an unterminated string cannot be parsed anyway
+                break
+            i = j
+        elif char in _openers:
+            stacks[_openers[char]].append(0)
+        elif char in _closers:
+            kind = _closers[char]
+            stack = stacks[kind]
+            if stack:
+                depth = stack.pop() + 1
+                if stack and depth > stack[-1]:
+                    stack[-1] = depth
+                if depth > depths[kind]:
+                    depths[kind] = depth
+        i += 1
+    return depths
 
 
 @contextmanager
@@ -163,6 +181,38 @@ def _trimming_exception_traceback():
         raise e
 
 
+class _TreeCache:
+    """LRU cache of parsed expression trees, with hit and miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._trees = OrderedDict()
+
+    def get(self, key):
+        tree = self._trees.get(key)
+        if tree is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._trees.move_to_end(key)
+        return tree
+
+    def put(self, key, tree):
+        self._trees[key] = tree
+        self._trees.move_to_end(key)
+        if len(self._trees) > self.maxsize:
+            self._trees.popitem(last=False)
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._trees))
+
+    def clear(self):
+        self.hits = self.misses = 0
+        self._trees.clear()
+
+
 def collapse_operands(seq, eps=1e-15):
     cur = list(seq)
     last = cur[:]
@@ -257,6 +307,37 @@ def constrained_gamma(x):
 
 
 
+def _fold(function):
+    """Evaluates a constant subtree once, and returns a function returning its value.
+    If the evaluation fails or the value is too large to be kept, returns `function` so the error is raised when evaluated."""
+    try:
+        value = function()
+    except Exception:
+        return function
+    if sys.getsizeof(value) > _maximum_folded_size:
+        return function
+    return lambda: value
+
+
+def _all_constant(tokens):
+    """Whether every operand of a node is constant, operators being strings."""
+    return all(isinstance(t, str) or (isinstance(t, ArithNode) and t.is_constant()) for t in tokens)
+
+
+def _compile_unary(operand, fns):
+    """Returns a function applying the functions `fns` in order to the result of `operand`."""
+    if len(fns) == 1:
+        fn, = fns
+        return lambda: fn(operand())
+
+    def evaluate():
+        ret = operand()
+        for fn in fns:
+            ret = fn(ret)
+        return ret
+    return evaluate
+
+
 @total_ordering
 class ArithNode:
     def __init__(self, tokens):
@@ -267,10 +348,27 @@ class ArithNode:
             self.iterable_tokens = False
         else:
             self.iterable_tokens = not isinstance(self.tokens, str)
+        self._compiled = None
 
     def evaluate(self):
         raise NotImplementedError
 
+    def compiled(self):
+        """Returns a function without arguments evaluating the node, built on the first call."""
+        if self._compiled is None:
+            function = self._compile()
+            if self.is_constant():
+                function = _fold(function)
+            self._compiled = function
+        return self._compiled
+
+    def _compile(self):
+        return self.evaluate
+
+    def is_constant(self):
+        """Whether the node always evaluates to the same value, whatever the variables are."""
+        return False
+
     def right_associative_evaluate(self, oper_fn_map):
         pass
 
@@ -302,6 +400,9 @@ class LiteralNode(ArithNode):
         else:
             return self.tokens
 
+    def is_constant(self):
+        return True
+
     def __repr__(self):
         return repr(self.tokens)
 
@@ -310,6 +411,13 @@ class SetNode(ArithNode):
     def evaluate(self):
         return PrettySet(t.evaluate() for t in self.tokens)
 
+    def _compile(self):
+        elements = [t.compiled() for t in self.tokens]
+        return lambda: PrettySet(element() for element in elements)
+
+    def is_constant(self):
+        return _all_constant(self.tokens)
+
     def __repr__(self):
         return "{" + ", ".join(map(repr, self.tokens)) + "}"
 
@@ -329,6 +437,17 @@ class UnaryNode(ArithNode):
             ret = oper_fn_map[op](ret)
         return ret
 
+    def right_associative_compile(self, oper_fn_map):
+        *opers, operand = self.tokens
+        return _compile_unary(operand.compiled(), [oper_fn_map[op] for op in opers])
+
+    def left_associative_compile(self, oper_fn_map):
+        operand, *opers = self.tokens
+        return _compile_unary(operand.compiled(), [oper_fn_map[op] for op in opers])
+
+    def is_constant(self):
+        return _all_constant(self.tokens)
+
     def __repr__(self):
         repr_tokens = self.tokens[:]
         for i in range(len(repr_tokens) - 1):
@@ -349,6 +468,26 @@ class BinaryNode(ArithNode):
             ret = oper_fn_map[oper](ret, operand.evaluate())
         return ret
 
+    def left_associative_compile(self, oper_fn_map):
+        first = self.tokens[0].compiled()
+        rest = [
+            (oper_fn_map[oper], operand.compiled())
+            for oper, operand in zip(self.tokens[1::2], self.tokens[2::2])
+        ]
+        if len(rest) == 1:
+            (fn, second), = rest
+            return lambda: fn(first(), second())
+
+        def evaluate():
+            ret = first()
+            for fn, operand in rest:
+                ret = fn(ret, operand())
+            return ret
+        return evaluate
+
+    def is_constant(self):
+        return _all_constant(self.tokens)
+
     def __repr__(self):
         repr_tokens = self.tokens[:]
         for i in range(1, len(repr_tokens), 2):
@@ -376,6 +515,25 @@ class TernaryNode(ArithNode):
         with _trimming_exception_traceback():
             return self.left_associative_evaluate(self.opns_map)
 
+    def _compile(self):
+        operands = self.tokens
+        first = operands[0].compiled()
+        rest = [
+            (self.opns_map[operands[i], operands[i + 2]], operands[i + 1].compiled(), operands[i + 3].compiled())
+            for i in range(1, len(operands), 4)
+        ]
+
+        def evaluate():
+            # both operands are evaluated, like `left_associative_evaluate` does
+            ret = first()
+            for fn, operand1, operand2 in rest:
+                ret = fn(ret, operand1(), operand2())
+            return ret
+        return evaluate
+
+    def is_constant(self):
+        return _all_constant(self.tokens)
+
     def __repr__(self):
         repr_tokens = self.tokens[:]
         for i in range(1, len(repr_tokens), 2):
@@ -462,6 +620,9 @@ class ArithmeticParser:
             with _trimming_exception_traceback():
                 return self.right_associative_evaluate(self.opns_map)
 
+        def _compile(self):
+            return self.right_associative_compile(self.opns_map)
+
     class ArithmeticUnaryPostOp(UnaryNode):
         opns_map = {}
 
@@ -469,6 +630,9 @@ class ArithmeticParser:
             with _trimming_exception_traceback():
                 return self.left_associative_evaluate(self.opns_map)
 
+        def _compile(self):
+            return self.left_associative_compile(self.opns_map)
+
     class ArithmeticBinaryOp(BinaryNode):
         opns_map = {
             "+": operator.add,
@@ -489,6 +653,9 @@ class ArithmeticParser:
             with _trimming_exception_traceback():
                 return self.left_associative_evaluate(self.opns_map)
 
+        def _compile(self):
+            return self.left_associative_compile(self.opns_map)
+
     class ExponentBinaryOp(ArithmeticBinaryOp):
         def evaluate(self):
             with _trimming_exception_traceback():
@@ -499,8 +666,20 @@ class ArithmeticParser:
 
                 return safe_pow(*operands)
 
+        def _compile(self):
+            operands = [t.compiled() for t in self.tokens[::2]]
+
+            def evaluate():
+                values = [operand() for operand in operands]
+                if not all(isinstance(value, (int, float, complex)) for value in values):
+                    raise TypeError("invalid operators for exponentiation")
+                return safe_pow(*values)
+            return evaluate
+
     class IdentifierNode(ArithNode):
-        _assigned_vars = {}
+        @property
+        def _assigned_vars(self):
+            return _active_session.get()._variable_map
 
         @property
         def name(self):
@@ -512,6 +691,17 @@ class ArithmeticParser:
                     return self._assigned_vars[self.name].evaluate()
                 raise NameError("Variable `{}` is undefined".format(self.name))
 
+        def _compile(self):
+            name = self.name
+
+            def evaluate():
+                # variables are looked up when evaluated, the same tree being shared by every session
+                node = _active_session.get()._variable_map.get(name)
+                if node is None:
+                    raise NameError("Variable `{}` is undefined".format(name))
+                return node.compiled()()
+            return evaluate
+
         def __repr__(self):
             return self.name
 
@@ -547,14 +737,75 @@ class ArithmeticParser:
                     )
                 return fn_spec.method(*[arg.evaluate() for arg in fn_args])
 
+        def _compile(self):
+            fn_name, *fn_args = self.tokens
+            fn_spec = self.fn_map.get(fn_name.lower())
+            arity = fn_spec.arity if fn_spec is not None else None
+            if fn_spec is None or not (len(fn_args) in arity if isinstance(arity, tuple) else arity in (len(fn_args), ...)):
+                # raises the error when evaluated
+                return self.evaluate
+            method = fn_spec.method
+            args = [arg.compiled() for arg in fn_args]
+            return lambda: method(*[arg() for arg in args])
+
+        def is_constant(self):
+            fn_name, *fn_args = self.tokens
+            fn_spec = self.fn_map.get(fn_name.lower())
+            return fn_spec is not None and fn_spec.pure and _all_constant(fn_args)
+
         def __repr__(self):
             return "{}({})".format(self.tokens[0], ", ".join(map(repr, self.tokens[1:])))
 
-    def __init__(self, max_number_custom_vars: int):
+    # Prototype parser of each class, holding the configuration set by `customize` and the grammar built from it
+    _prototypes = {}
+
+    # Trees of the expressions without side effects (no assignment), shared by the parsers of the same class
+    _tree_cache = _TreeCache(maxsize=1024)
+
+    # Attributes set by `_configure`, shared by every parser of a class
+    _config_attributes = (
+        "_added_operator_specs", "_added_function_specs", "_base_operators", "_base_function_map", "epsilon",
+        "ident_letters", "maximum_expression_length", "maximum_expression_depth", "maximum_formula_depth", "maximum_set_depth", "_initial_variables"
+    )
+
+    # Parsing engines: the pyparsing grammar, or the hand-written precedence parser building the same trees
+    engines = ("pyparsing", "precedence")
+
+    def __init__(self, max_number_custom_vars: int, engine: str = "pyparsing"):
+        if engine not in self.engines:
+            raise ValueError("Unknown parsing engine {!r}".format(engine))
+        self.engine = engine
+        self._init_session(max_number_custom_vars)
+        prototype = self._get_prototype()
+        for attr in self._config_attributes:
+            setattr(self, attr, getattr(prototype, attr))
+        self._parser = prototype._parser
+        self._precedence_parser = prototype._precedence_parser
+        # storage for assigned variables, starting with the pre-defined ones
+        self._variable_map.update(prototype._variable_map)
+
+    def _init_session(self, max_number_custom_vars):
+        self._parser = None
+        self._precedence_parser = None
         self.max_number_custom_vars = max_number_custom_vars
         self.number_custom_vars = 0
         self.max_var_memory = 10 ** 6
+        self.var_assignment = False
+        self._variable_map = {}
 
+    @classmethod
+    def _get_prototype(cls):
+        """Returns the prototype parser of the class, configuring it and building its grammar on first use."""
+        prototype = cls._prototypes.get(cls)
+        if prototype is None:
+            prototype = cls.__new__(cls)
+            prototype._init_session(0)
+            prototype._configure()
+            prototype.get_parser()
+            cls._prototypes[cls] = prototype
+        return prototype
+
+    def _configure(self):
         self._added_operator_specs = []
         self._added_function_specs = {}
         self._base_operators = (
@@ -582,21 +833,17 @@ class ArithmeticParser:
             + pp.srange("[Α-Ωα-ω]")
         )
 
-        # customize can raise or lower the maximum expression depth
+        # customize can raise or lower the maximum expression length and depth
         # to be supported - default = 8
+        self.maximum_expression_length = 1000
         self.maximum_expression_depth = 6
         self.maximum_formula_depth = 12
         self.maximum_set_depth = 6
 
-        # storage for assigned variables
-        self._variable_map = {}
-
         # customize can add pre-defined constants
         self._initial_variables = {}
 
         self.customize()
-        self.var_assignment = False
-        self._parser = self.make_parser()
 
     @property
     def base_function_map(self):
@@ -615,27 +862,68 @@ class ArithmeticParser:
         return self._added_operator_specs[:]
 
     def scanString(self, *args):
-        yield from self.get_parser().scanString(*args)
+        # The session is only active while the grammar scans, not while the caller handles a match
+        scanner = self.get_parser().scanString(*args)
+        while True:
+            with self.session():
+                match = next(scanner, None)
+            if match is None:
+                return
+            yield match
+
+    @contextmanager
+    def session(self):
+        """Makes the variables of this parser the ones used by the shared grammar, while parsing and evaluating."""
+        token = _active_session.set(self)
+        try:
+            yield self
+        finally:
+            _active_session.reset(token)
 
     def parse(self, *args, **kwargs):
         """Parses an expression."""
         self.var_assignment = False
-        if _get_expression_depth(args[0]) > self.maximum_expression_depth:
+        if len(args[0]) > self.maximum_expression_length:
+            raise ValueError("Expression is longer than {} characters".format(self.maximum_expression_length))
+
+        expression_depth, set_depth = _get_depths(args[0])
+        if expression_depth > self.maximum_expression_depth:
             raise OverflowError("expression too deeply nested")
 
-        if _get_set_depth(args[0]) > self.maximum_set_depth:
+        if set_depth > self.maximum_set_depth:
             raise OverflowError("set too deeply nested")
 
-        parsed = self.get_parser().parseString(*args, **kwargs)
+        parser = self._precedence_parser if self.engine == "precedence" else self.get_parser()
+        with self.session():
+            parsed = parser.parseString(*args, **kwargs)
 
         if parsed:
             return parsed[0]
 
+    def parse_cached(self, arith_expression):
+        """Parses a whole expression, reusing the tree of a previous parse if the expression has no side effects.
+        Cached trees are shared by the parsers of the class, so they are only evaluated in the active session."""
+        key = (type(self), self.engine, arith_expression)
+        parsed = self._tree_cache.get(key)
+        if parsed is not None:
+            self.var_assignment = False
+            return parsed
+        parsed = self.parse(arith_expression, parseAll=True)
+        if not self.var_assignment:
+            parsed._session = None
+            self._tree_cache.put(key, parsed)
+        return parsed
+
+    @classmethod
+    def cache_info(cls):
+        """Returns the hits, misses, maximum size and current size of the parsed trees cache."""
+        return cls._tree_cache.info()
+
     def evaluate(self, arith_expression):
         """Evaluates an expression and returns its result."""
-        with _trimming_exception_traceback():
-            parsed = self.parse(arith_expression, parseAll=True)
-            result = parsed.evaluate()
+        with _trimming_exception_traceback(), self.session():
+            parsed = self.parse_cached(arith_expression)
+            result = parsed.compiled()()
             if self.max_number_custom_vars and not self.var_assignment:
                 self._variable_map["ANS"] = LiteralNode([result])
         return result
@@ -643,9 +931,17 @@ class ArithmeticParser:
     def __getattr__(self, attr):
         parser = self._parser
         if hasattr(parser, attr):
-            return getattr(parser, attr)
+            value = getattr(parser, attr)
+            if callable(value):
+                # Methods of the grammar, such as `parseString`, run in the session of this parser
+                return partial(self._call_in_session, value)
+            return value
         raise AttributeError("no such attribute {!r}".format(attr))
 
+    def _call_in_session(self, function, *args, **kwargs):
+        with self.session():
+            return function(*args, **kwargs)
+
     def __getitem__(self, key):
         self_vars = self.vars()
         if key in self_vars:
@@ -688,12 +984,14 @@ class ArithmeticParser:
     def initialize_variable(self, vname, vvalue, as_formula=False):
         self._initial_variables[vname] = (vvalue, as_formula)
 
-    def add_function(self, fn_name, fn_arity, fn_method):
-        self._added_function_specs[fn_name] = FunctionSpec(fn_method, fn_arity)
+    def add_function(self, fn_name, fn_arity, fn_method, pure=True):
+        """Adds a function, `pure` being False if it may return different results for the same arguments."""
+        self._added_function_specs[fn_name] = FunctionSpec(fn_method, fn_arity, pure)
 
     def get_parser(self):
         if self._parser is None:
-            self._parser = self.make_parser()
+            with self.session():
+                self._parser = self.make_parser()
         return self._parser
 
     def make_parser(self):
@@ -777,11 +1075,31 @@ class ArithmeticParser:
                         last = next_
                     return ret
 
+            def _compile(self):
+                first = self.tokens[0].compiled()
+                rest = [
+                    (self.opns_map[oper], operand.compiled())
+                    for oper, operand in zip(self.tokens[1::2], self.tokens[2::2])
+                ]
+
+                def evaluate():
+                    last = first()
+                    ret = True
+                    for fn, operand in rest:
+                        next_ = operand()
+                        ret = ret and fn(last, next_)
+                        last = next_
+                    return ret
+                return evaluate
+
         class UnaryNot(UnaryNode):
             def evaluate(self):
                 with _trimming_exception_traceback():
                     return self.right_associative_evaluate({"not": operator.not_})
 
+            def _compile(self):
+                return self.right_associative_compile({"not": operator.not_})
+
         class InRangeNode(UnaryNode):
             def evaluate(self):
                 nonlocal identifier_node_class
@@ -850,6 +1168,25 @@ class ArithmeticParser:
                         last = next_
                     return ret
 
+            def _compile(self):
+                first = self.tokens[0].compiled()
+                rest = [
+                    (self.opns_map[oper], operand.compiled())
+                    for oper, operand in zip(self.tokens[1::2], self.tokens[2::2])
+                ]
+
+                def evaluate():
+                    last = bool(first())
+                    ret = True
+                    for fn, operand in rest:
+                        next_ = bool(operand())
+                        ret = ret and fn(last, next_)
+                        if not ret:
+                            break
+                        last = next_
+                    return ret
+                return evaluate
+
         class TernaryComp(TernaryNode):
             opns_map = {
                 ("?", ":"): (lambda a, b, c: b if a else c),
@@ -859,6 +1196,11 @@ class ArithmeticParser:
             def __init__(self, result):
                 self._result = result
                 self.epsilon = 1e-15
+                self._compiled = None
+                # Parser the result was parsed with, whose session is used to evaluate it outside of any session
+                # Only a weak reference is kept, so that a result does not keep a finished session in memory
+                session = _active_session.get(None)
+                self._session = None if session is None else weakref.ref(session)
 
             def __repr__(self):
                 return "~" + str(self._result)
@@ -866,26 +1208,42 @@ class ArithmeticParser:
             def evaluate(self):
                 with _trimming_exception_traceback():
                     # print(self._result.dump())
-                    ret = self._result[0].evaluate()
-                    if isinstance(ret, (float, complex)):
-                        if math.isclose(ret.imag, 0, abs_tol=self.epsilon):
-                            ret = round(ret.real, 15)
-                        if math.isclose(ret.real, 0, abs_tol=self.epsilon):
-                            if ret.imag:
-                                ret = complex(0, ret.imag)
-                            else:
-                                ret = 0
-                        if (
-                            not isinstance(ret, complex)
-                            and abs(ret) < 1e15
-                            and math.isclose(ret, int(ret), abs_tol=self.epsilon)
-                        ):
-                            return int(ret)
-                    return ret
-
-        identifier_node_class = type(
-            "Identifier", (self.IdentifierNode,), {"_assigned_vars": self._variable_map}
-        )
+                    return self._round(self._in_session(self._result[0].evaluate))
+
+            def compiled(self):
+                """Returns a function without arguments evaluating the result, built on the first call."""
+                if self._compiled is None:
+                    node = self._result[0]
+                    result = node.compiled()
+                    function = lambda: self._round(self._in_session(result))
+                    self._compiled = _fold(function) if node.is_constant() else function
+                return self._compiled
+
+            def _in_session(self, function):
+                session = None if self._session is None else self._session()
+                if session is None or _active_session.get(None) is not None:
+                    return function()
+                with session.session():
+                    return function()
+
+            def _round(self, ret):
+                if isinstance(ret, (float, complex)):
+                    if math.isclose(ret.imag, 0, abs_tol=self.epsilon):
+                        ret = round(ret.real, 15)
+                    if math.isclose(ret.real, 0, abs_tol=self.epsilon):
+                        if ret.imag:
+                            ret = complex(0, ret.imag)
+                        else:
+                            ret = 0
+                    if (
+                        not isinstance(ret, complex)
+                        and abs(ret) < 1e15
+                        and math.isclose(ret, int(ret), abs_tol=self.epsilon)
+                    ):
+                        return int(ret)
+                return ret
+
+        identifier_node_class = type("Identifier", (self.IdentifierNode,), {})
         var_name.addParseAction(identifier_node_class)
 
         def set_intersection(a, b):
@@ -924,12 +1282,29 @@ class ArithmeticParser:
                 with _trimming_exception_traceback():
                     return self.left_associative_evaluate(self.opns_map)
 
+            def _compile(self):
+                return self.left_associative_compile(self.opns_map)
+
+        set_operator_spellings = ["∩", "inter", "∪", "union", "\\", "diff", "∆", "symdiff"]
         set_expression = pp.infixNotation(set_operand | var_name, [
-            (pp.oneOf("∩ inter ∪ union \\ diff ∆ symdiff"), 2, pp.opAssoc.LEFT, SetBinaryOp),
+            (pp.oneOf(" ".join(set_operator_spellings)), 2, pp.opAssoc.LEFT, SetBinaryOp),
             ])
 
         # noinspection PyUnresolvedReferences
         NOT_IN = (NOT() + IN()).addParseAction('_'.join)
+        # Operators of `base_operator_specs` as written, for the precedence engine
+        base_operator_spellings = [
+            ["^"],
+            ["+", "-", "−"],
+            ["*", "//", "/", "mod", "×", "of", "⋅", "·", "÷"],
+            ["+", "-", "−"],
+            ["<", ">", "<=", ">=", "⩵", "==", "!=", "≠", "≤", "≥", "⩽", "⩾"],
+            ["in", "not in", "∈", "∉"],
+            ["not"],
+            ["and", "∧"],
+            ["or", "∨"],
+            [("?", ":")],
+        ]
         base_operator_specs = [
             ("^", 2, pp.opAssoc.LEFT, self.ExponentBinaryOp),
             (pp.oneOf("+ - −"), 1, pp.opAssoc.RIGHT, self.ArithmeticUnaryOp),
@@ -1006,34 +1381,35 @@ class ArithmeticParser:
         )
 
         def eval_and_store_value(tokens):
+            session = _active_session.get()
             if len(tokens.lhs) > len(tokens.rhs):
                 raise NameError("Not enough values were given")
             if len(tokens.lhs) < len(tokens.rhs):
                 raise NameError("Not enough variable names were given")
 
             assignments = []
-            assigned_vars = identifier_node_class._assigned_vars
+            assigned_vars = session._variable_map
             for lhs_name, rhs_expr in zip(tokens.lhs, tokens.rhs):
                 rval = LiteralNode([rhs_expr.evaluate()])
                 var_name = lhs_name.name
                 new_variable = (var_name not in assigned_vars)
-                if (new_variable and self.number_custom_vars >= self.max_number_custom_vars):
-                    if self.max_number_custom_vars:
-                        raise TooManyVariablesException("Cannot define more than {} variables".format(self.max_number_custom_vars))
+                if (new_variable and session.number_custom_vars >= session.max_number_custom_vars):
+                    if session.max_number_custom_vars:
+                        raise TooManyVariablesException("Cannot define more than {} variables".format(session.max_number_custom_vars))
                     raise TooManyVariablesException("Cannot define variables in non-session mode")
-                if var_name in self._initial_variables.keys():
+                if var_name in session._initial_variables.keys():
                     raise NameError("Cannot replace variable `{}` as it is predefined".format(var_name))
                 if var_name == "ANS":
                     raise NameError("Cannot replace variable `ANS` as it is a special variable")
                 if var_name in special_keywords:
                     raise NameError("Cannot use variable `{}` as it is a special keyword".format(var_name))
-                if (sum(sys.getsizeof(vv) for vv in assigned_vars.values()) > self.max_var_memory):
+                if (sum(sys.getsizeof(vv) for vv in assigned_vars.values()) > session.max_var_memory):
                     raise TooManyVariablesException("Not enough memory to store new variable")
                 if new_variable:
-                    self.number_custom_vars += 1
+                    session.number_custom_vars += 1
                 assigned_vars[var_name] = rval
                 assignments.append(rval)
-            self.var_assignment = True
+            session.var_assignment = True
             return LiteralNode([assignments]) if len(assignments) > 1 else rval
 
         value_assignment_statement.addParseAction(eval_and_store_value)
@@ -1046,11 +1422,12 @@ class ArithmeticParser:
         formula_assignment_statement.setName("formula statement")
 
         def verify_formula_not_recursive(tokens):
+            session = _active_session.get()
             # see if this var_name is recursively referenced
             formula_defn = tokens.rhs
             dest_var_name = tokens.lhs.name
 
-            if dest_var_name in self._initial_variables.keys():
+            if dest_var_name in session._initial_variables.keys():
                 raise NameError("Cannot replace variable `{}` as it is predefined".format(dest_var_name))
             if dest_var_name == "ANS":
                 raise NameError("Cannot replace variable `ANS` as it is a special variable")
@@ -1065,7 +1442,7 @@ class ArithmeticParser:
                         # raise Exception("illegal recursion, {!r} is used in expression".format(dest_var_name))
                         raise NameError("Cannot define `{}` as an expression that contains it".format(dest_var_name))
 
-                    cur_expr = self._variable_map.get(cur_expr.name)
+                    cur_expr = session._variable_map.get(cur_expr.name)
                     if cur_expr is not None:
                         to_visit.append(cur_expr)
                     continue
@@ -1080,7 +1457,8 @@ class ArithmeticParser:
                     continue
 
         def store_parsed_value(tokens):
-            self.var_assignment = True
+            session = _active_session.get()
+            session.var_assignment = True
 
             def get_depth(formula_node):
                 max_depth = 0
@@ -1090,7 +1468,7 @@ class ArithmeticParser:
                     max_depth = max(max_depth, cur_depth)
 
                     if isinstance(cur_expr, self.IdentifierNode):
-                        cur_expr = self._variable_map.get(cur_expr.name)
+                        cur_expr = session._variable_map.get(cur_expr.name)
                         if cur_expr is not None:
                             to_visit.append((cur_depth + 1, cur_expr))
                         continue
@@ -1109,16 +1487,16 @@ class ArithmeticParser:
             # check if any formulas exceed maximum allowed depth
             rval = tokens.rhs
             dest_var_name = tokens.lhs.name
-            assigned_vars = identifier_node_class._assigned_vars
+            assigned_vars = session._variable_map
             new_var = (dest_var_name not in assigned_vars)
-            if (new_var and self.number_custom_vars >= self.max_number_custom_vars):
-                if self.max_number_custom_vars:
-                    raise TooManyVariablesException("Cannot define more than {} variables".format(self.max_number_custom_vars))
+            if (new_var and session.number_custom_vars >= session.max_number_custom_vars):
+                if session.max_number_custom_vars:
+                    raise TooManyVariablesException("Cannot define more than {} variables".format(session.max_number_custom_vars))
                 raise TooManyVariablesException("Cannot define variables in non-session mode")
-            if (sum(sys.getsizeof(vv) for vv in assigned_vars.values()) > self.max_var_memory):
+            if (sum(sys.getsizeof(vv) for vv in assigned_vars.values()) > session.max_var_memory):
                 raise TooManyVariablesException("Not enough memory to store new variable")
             if new_var:
-                self.number_custom_vars += 1
+                session.number_custom_vars += 1
             assigned_vars[dest_var_name] = rval
 
             # verify that no expressions exceed max depth
@@ -1127,17 +1505,18 @@ class ArithmeticParser:
                     continue
 
                 formula_depth = get_depth(formula_defn)
-                if formula_depth > self.maximum_formula_depth:
+                if formula_depth > session.maximum_formula_depth:
                     assigned_vars.pop(dest_var_name, None)
                     raise OverflowError("function variables nested too deeply")
             
             return rval
 
         def clear_parsed_value(tokens):
-            assigned_vars = identifier_node_class._assigned_vars
+            session = _active_session.get()
+            assigned_vars = session._variable_map
 
             for var in tokens.lhs:
-                if var.name in self._initial_variables.keys():
+                if var.name in session._initial_variables.keys():
                     raise NameError("Cannot erase variable `{}` as it is predefined".format(var.name))
                 if var.name in special_keywords:
                     raise NameError("Cannot erase `{}` as it is a special keyword".format(var.name))
@@ -1147,18 +1526,19 @@ class ArithmeticParser:
                 except KeyError:
                     raise NameError("Variable `{}` is undefined".format(var.name))
                 if (var.name != "ANS"):
-                    self.number_custom_vars -= 1
+                    session.number_custom_vars -= 1
             
-            self.var_assignment = True
+            session.var_assignment = True
             return tokens.lhs.asList()
 
         def get_all_variables(tokens):
+            session = _active_session.get()
             if tokens.lhs in ("VARIABLES", "VARS"):
                 return_str = "Predefined variables:\n"
-                all_assigned_vars = identifier_node_class._assigned_vars
-                custom_vars = {key: value for key, value in all_assigned_vars.items() if key not in self._initial_variables.keys()}
+                all_assigned_vars = session._variable_map
+                custom_vars = {key: value for key, value in all_assigned_vars.items() if key not in session._initial_variables.keys()}
 
-                for name, value in self._initial_variables.items():
+                for name, value in session._initial_variables.items():
                     return_str += "\t{} = {}\n".format(name, value[0])
                 
                 ansVar = custom_vars.get("ANS")
@@ -1166,7 +1546,7 @@ class ArithmeticParser:
                 if ansVar is not None: LENGTH -= 1
 
                 if LENGTH:
-                    return_str += "\nCustom variables ({}/{}):\n".format(LENGTH, self.max_number_custom_vars)
+                    return_str += "\nCustom variables ({}/{}):\n".format(LENGTH, session.max_number_custom_vars)
                     for name, value in custom_vars.items():
                         if name != "ANS": return_str += "\t{} = {}\n".format(name, value)
                 
@@ -1175,13 +1555,13 @@ class ArithmeticParser:
                 
                 raise SilentException(return_str)
 
-            assigned_vars = identifier_node_class._assigned_vars
+            assigned_vars = session._variable_map
             all_vars = tuple(assigned_vars.keys())
             for variable in all_vars:
-                if variable not in self._initial_variables.keys():
+                if variable not in session._initial_variables.keys():
                     assigned_vars.pop(variable, None)
-                    self.number_custom_vars -= 1
-            self.var_assignment = True
+                    session.number_custom_vars -= 1
+            session.var_assignment = True
             raise SilentException(None)
 
 
@@ -1194,6 +1574,24 @@ class ArithmeticParser:
 
         parser = value_assignment_statement | get_vars | value_clear_statement | formula_assignment_statement | lone_rvalue
 
+        self._precedence_parser = _PrecedenceParser(
+            self.ident_letters,
+            [([str(expr)], arity, assoc, node_class) for expr, arity, assoc, node_class in self._added_operator_specs]
+            + [(spellings, arity, assoc, node_class)
+               for spellings, (_, arity, assoc, node_class) in zip(base_operator_spellings, base_operator_specs)],
+            (set_operator_spellings, SetBinaryOp),
+            function_class=function_node_class,
+            identifier_class=identifier_node_class,
+            range_class=InRangeNode,
+            result_class=RoundToEpsilon,
+            string_expression=string_operand,
+            value_assignment=eval_and_store_value,
+            formula_check=verify_formula_not_recursive,
+            formula_assignment=store_parsed_value,
+            value_clear=clear_parsed_value,
+            get_variables=get_all_variables,
+        )
+
         # init _variable_map with any pre-defined values
         for varname, (varvalue, as_formula) in self._initial_variables.items():
             if as_formula:
@@ -1219,6 +1617,436 @@ class ArithmeticParser:
         return ret
 
 
+# Items of the operator stack of `_PrecedenceParser`
+_LPAR, _PREFIX, _POSTFIX, _INFIX, _INFIX_RIGHT, _TERNARY_OPEN, _TERNARY = range(7)
+
+_Operator = namedtuple("_Operator", "spelling words keyword token prec arity assoc node_class op2")
+
+
+class _PrecedenceParser:
+    """Parser engine for the grammar of `ArithmeticParser.make_parser` which does not use pyparsing.
+    Operands are scanned with regular expressions, and operators are parsed with an operand stack and an operator stack,
+    following the algorithm of `pp.infixNotation` so that both engines build the same trees."""
+
+    whitespace = re.compile(r"[ \n\t\r]*")
+    number = re.compile(r"[+-]?(?:\d+(?:[eE][+-]?\d+)|(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?)")
+    integer = re.compile(r"[+-]?\d+")
+    quoted_string = re.compile(r""""(?:\\.|[^"\n\r\\])*"|'(?:\\.|[^'\n\r\\])*'""")
+    assignment_operator = re.compile("<-|=|←")
+    clear_command = re.compile("CLEAR|ERASE|DELETE|RESET")
+    variables_command = re.compile("VARS|VARIABLES|CLEARALL|ERASEALL|DELETEALL|RESETALL")
+    keyword_chars = pp.Keyword.DEFAULT_KEYWORD_CHARS
+    rounding_functions = {"⌊⌋": "floor", "⌈⌉": "ceil", "⌊⌉": "round", "⌈⌋": "round"}
+
+    def __init__(self, ident_letters, operator_specs, set_operator_spec, function_class, identifier_class, range_class,
+                 result_class, string_expression, value_assignment, formula_check, formula_assignment, value_clear,
+                 get_variables):
+        letters = re.escape("_" + ident_letters)
+        self._function_name = re.compile("[{0}][{0}0-9]*".format(letters))
+        self._identifier = re.compile("[{0}][{0}0-9]*[ₐ-ₜ₀-₉]*".format(letters))
+        self._identifier_start = frozenset("_" + ident_letters)
+
+        # First character -> operators which can be written there, before an operand or after one
+        self._prefix_operators = {}
+        self._operators = {}
+        postfix_operators, infix_operators = [], []
+        for i, (spellings, arity, assoc, node_class) in enumerate(operator_specs):
+            prec = len(operator_specs) - i
+            for spelling in spellings:
+                op2 = None
+                if arity == 3:
+                    spelling, op2 = spelling
+                words = tuple(spelling.split())
+                keyword = all(word.upper() in keywords for word in words)
+                op = _Operator(spelling, words, keyword, "_".join(words), prec, arity, assoc, node_class, op2)
+                if arity == 1 and assoc == pp.opAssoc.RIGHT:
+                    self._prefix_operators.setdefault(spelling[0], []).append(op)
+                elif arity == 1:
+                    postfix_operators.append(op)
+                else:
+                    infix_operators.append(op)
+        # the longest operator wins, so `!=` is not read as the factorial operator
+        for op in sorted(postfix_operators + infix_operators, key=lambda op: -len(op.spelling)):
+            self._operators.setdefault(op.spelling[0], []).append(op)
+
+        set_spellings, set_binary_class = set_operator_spec
+        self._set_operators = {}
+        for spelling in set_spellings:
+            op = _Operator(spelling, (spelling,), False, spelling, 1, 2, pp.opAssoc.LEFT, set_binary_class, None)
+            self._set_operators.setdefault(spelling[0], []).append(op)
+
+        self._function_class = function_class
+        self._identifier_class = identifier_class
+        self._range_class = range_class
+        self._result_class = result_class
+        self._string_expression = string_expression
+        self._statements = (
+            self._value_assignment, self._get_variables, self._value_clear, self._formula_assignment, self._lone_value
+        )
+        self._assign_values = value_assignment
+        self._check_formula = formula_check
+        self._assign_formula = formula_assignment
+        self._clear_values = value_clear
+        self._show_variables = get_variables
+
+    def parseString(self, instring, parseAll=False):
+        """Parses a statement and returns its results, like the pyparsing parser."""
+        for statement in self._statements:
+            try:
+                results, loc = statement(instring)
+            except ParseException:
+                continue
+            break
+        else:
+            raise ParseException(instring, 0, "Expected a statement or an expression")
+
+        if parseAll and self.whitespace.match(instring, loc).end() != len(instring):
+            raise ParseException(instring, loc, "Expected end of text")
+        return results
+
+    # Statements
+
+    def _value_assignment(self, s):
+        lhs, loc = self._parse_list(s, self.whitespace.match(s).end(), self._parse_identifier)
+        match = self.assignment_operator.match(s, self.whitespace.match(s, loc).end())
+        if not lhs or not match:
+            raise ParseException(s, loc, "Expected an assignment")
+        rhs, loc = self._parse_list(s, match.end(), self._parse_rvalue)
+        if not rhs:
+            raise ParseException(s, loc, "Expected an expression")
+        self._expect_end(s, loc)
+        return [self._result_class([self._assign_values(SimpleNamespace(lhs=lhs, rhs=rhs))])], loc
+
+    def _get_variables(self, s):
+        match = self.variables_command.match(s, self.whitespace.match(s).end())
+        if not match:
+            raise ParseException(s, 0, "Expected a command")
+        self._expect_end(s, match.end())
+        self._show_variables(SimpleNamespace(lhs=match.group()))
+        return [match.group()], match.end()
+
+    def _value_clear(self, s):
+        match = self.clear_command.match(s, self.whitespace.match(s).end())
+        if not match:
+            raise ParseException(s, 0, "Expected a command")
+        lhs, loc = self._parse_list(s, match.end(), self._parse_identifier)
+        if not lhs:
+            raise ParseException(s, loc, "Expected a variable")
+        self._expect_end(s, loc)
+        return self._clear_values(SimpleNamespace(lhs=pp.ParseResults(lhs))), loc
+
+    def _formula_assignment(self, s):
+        lhs, loc = self._parse_identifier(s, 0)
+        loc = self.whitespace.match(s, loc).end()
+        if not s.startswith("@=", loc):
+            raise ParseException(s, loc, "Expected a formula")
+        rhs, loc = self._parse_rvalue(s, loc + 2)
+        tokens = SimpleNamespace(lhs=lhs, rhs=rhs)
+        self._check_formula(tokens)
+        return [self._assign_formula(tokens)], loc
+
+    def _lone_value(self, s):
+        value, loc = self._parse_rvalue(s, 0)
+        return [self._result_class([value])], loc
+
+    def _expect_end(self, s, loc):
+        loc = self.whitespace.match(s, loc).end()
+        if loc != len(s):
+            raise ParseException(s, loc, "Expected end of text")
+
+    # Expressions
+
+    def _parse_rvalue(self, s, loc):
+        """Parses an arithmetic or a set expression, whichever is the longest, like `pp.Or`."""
+        loc = self.whitespace.match(s, loc).end()
+        matches, errors = [], []
+        for parse in (self._parse_arith, self._parse_set):
+            try:
+                matches.append(parse(s, loc))
+            except ParseBaseException as e:
+                errors.append(e)
+        if matches:
+            # a syntax error in one expression is ignored if the other one matches
+            return max(matches, key=lambda match: match[1])
+        raise max(errors, key=lambda e: (isinstance(e, pp.ParseFatalException), e.loc))
+
+    def _parse_arith(self, s, loc):
+        return self._parse_infix(s, loc, self._prefix_operators, self._operators, self._parse_operand)
+
+    def _parse_set(self, s, loc):
+        return self._parse_infix(s, loc, {}, self._set_operators, self._parse_set_operand)
+
+    def _parse_list(self, s, loc, parse_element):
+        """Parses elements separated by commas, and returns them with the position after the last one."""
+        elements = []
+        try:
+            element, loc = parse_element(s, loc)
+        except ParseException:
+            return elements, loc
+        elements.append(element)
+        while True:
+            comma = self.whitespace.match(s, loc).end()
+            if not s.startswith(",", comma):
+                return elements, loc
+            try:
+                element, loc = parse_element(s, comma + 1)
+            except ParseException:
+                return elements, loc
+            elements.append(element)
+
+    def _parse_identifier(self, s, loc):
+        loc = self.whitespace.match(s, loc).end()
+        match = self._identifier.match(s, loc)
+        if not match:
+            raise ParseException(s, loc, "Expected an identifier")
+        return self._identifier_class([match.group()]), match.end()
+
+    def _parse_operand(self, s, loc):
+        if loc >= len(s):
+            raise ParseException(s, loc, "Expected an operand")
+        char = s[loc]
+        if char in self._identifier_start:
+            match = self._function_name.match(s, loc)
+            lpar = self.whitespace.match(s, match.end()).end()
+            if s.startswith("(", lpar):
+                try:
+                    args, end = self._parse_list(s, lpar + 1, self._parse_arith)
+                    end = self._expect(s, end, ")")
+                except ParseException:
+                    pass
+                else:
+                    return self._function_class([[match.group(), *args]]), end
+            for keyword, value in (("True", True), ("False", False)):
+                end = self._match_keyword(s, loc, keyword)
+                if end >= 0:
+                    return LiteralNode([value]), end
+            return self._parse_identifier(s, loc)
+
+        if char == "|":
+            value, end = self._parse_arith(s, loc + 1)
+            return self._function_class([["abs", value]]), self._expect(s, end, "|")
+        if char in "⌊⌈":
+            value, end = self._parse_arith(s, loc + 1)
+            end = self.whitespace.match(s, end).end()
+            function = self.rounding_functions.get(char + s[end:end + 1])
+            if function is None:
+                raise ParseException(s, end, "Expected a closing bracket")
+            return self._function_class([[function, value]]), end + 1
+        if char in "\"'":
+            match = self.quoted_string.match(s, loc)
+            if not match:
+                raise ParseException(s, loc, "Expected a string")
+            if "\\" in match.group():
+                # escape sequences are rare, leave them to pyparsing
+                return self._string_expression.parseString(match.group())[0], match.end()
+            return LiteralNode([match.group()[1:-1]]), match.end()
+
+        match = self.number.match(s, loc)
+        if match:
+            return LiteralNode([float(match.group())]), match.end()
+        match = self.integer.match(s, loc)
+        if match:
+            return LiteralNode([int(match.group())]), match.end()
+        if char in "{(":
+            return self._parse_set(s, loc)
+        raise ParseException(s, loc, "Expected an operand")
+
+    def _parse_set_operand(self, s, loc):
+        if s.startswith("{", loc):
+            elements, end = self._parse_list(s, loc + 1, self._parse_arith)
+            return SetNode([elements]), self._expect(s, end, "}")
+        return self._parse_identifier(s, loc)
+
+    def _parse_range(self, s, loc):
+        """Parses what follows `in`."""
+        loc = self.whitespace.match(s, loc).end()
+        if s[loc:loc + 1] in ("(", ")", "[", "]"):
+            try:
+                lower, end = self._parse_arith(s, loc + 1)
+                end = self._expect(s, end, ",")
+                upper, end = self._parse_arith(s, end)
+                end = self.whitespace.match(s, end).end()
+                if s[end:end + 1] not in ("(", ")", "[", "]"):
+                    raise ParseException(s, end, "Expected a closing bracket")
+            except ParseException:
+                pass
+            else:
+                lower_inclusive, upper_inclusive = s[loc] in "[]", s[end] in "[]"
+                range_expr = pp.ParseResults([lower_inclusive, lower, upper, upper_inclusive])
+                range_expr["lower_inclusive"] = lower_inclusive
+                range_expr["lower"] = lower
+                range_expr["upper"] = upper
+                range_expr["upper_inclusive"] = upper_inclusive
+                return range_expr, end + 1
+        for parse in (self._parse_set, self._parse_identifier):
+            try:
+                return parse(s, loc)
+            except ParseException:
+                pass
+        raise ParseException(s, loc, "Expected a range, a set or a variable")
+
+    def _parse_infix(self, s, loc, prefix_operators, operators, parse_operand):
+        """Parses operands and operators, the way `pp.infixNotation` does."""
+        operands = []
+        stack = [] # [kind, precedence, operator, tokens]
+        depth = 0
+        expect_operand = True
+        while True:
+            loc = self.whitespace.match(s, loc).end()
+            if expect_operand:
+                op, end = self._match_operator(s, loc, prefix_operators)
+                if op is not None:
+                    stack.append([_PREFIX, op.prec, op, op.token])
+                    loc = end
+                    continue
+                try:
+                    operand, loc = parse_operand(s, loc)
+                except ParseException:
+                    pass
+                else:
+                    operands.append(operand)
+                    expect_operand = False
+                    continue
+                if s.startswith("(", loc):
+                    stack.append([_LPAR, 0, None, None])
+                    depth += 1
+                    loc += 1
+                    continue
+                raise ParseException(s, loc, "Expected an operand")
+
+            if depth and s.startswith(")", loc):
+                self._reduce(stack, operands, -1)
+                if stack and stack[-1][0] == _LPAR:
+                    stack.pop()
+                depth -= 1
+                loc += 1
+                continue
+
+            opened = self._find_open_ternary(stack, s, loc)
+            if opened is not None:
+                while stack[-1] is not opened:
+                    self._apply(stack.pop(), operands)
+                opened[0] = _TERNARY
+                opened[3][-1].append(opened[2].op2)
+                loc += len(opened[2].op2)
+                expect_operand = True
+                continue
+
+            op, end = self._match_operator(s, loc, operators)
+            if op is None:
+                break
+            top = stack[-1] if stack else None
+            if op.arity == 1:
+                tokens = [op.token]
+                if issubclass(op.node_class, self._range_class):
+                    # Like pyparsing, an `in` without a valid right-hand side ends the expression
+                    try:
+                        range_expr, end = self._parse_range(s, end)
+                    except ParseException:
+                        break
+                    tokens.append(range_expr)
+                if top is not None and top[0] == _POSTFIX and top[1] == op.prec:
+                    top[3].extend(tokens)
+                else:
+                    self._reduce(stack, operands, op.prec)
+                    stack.append([_POSTFIX, op.prec, op, tokens])
+            elif op.arity == 2:
+                self._reduce(stack, operands, op.prec)
+                top = stack[-1] if stack else None
+                if op.assoc != pp.opAssoc.LEFT:
+                    stack.append([_INFIX_RIGHT, op.prec, op, [op.token]])
+                elif top is not None and top[0] == _INFIX and top[1] == op.prec:
+                    top[3].append(op.token)
+                else:
+                    stack.append([_INFIX, op.prec, op, [op.token]])
+                expect_operand = True
+            else:
+                if op.assoc == pp.opAssoc.LEFT and top is not None and top[0] == _TERNARY and top[1] == op.prec:
+                    top[0] = _TERNARY_OPEN
+                    top[3].append([op.token])
+                else:
+                    self._reduce(stack, operands, op.prec)
+                    stack.append([_TERNARY_OPEN, op.prec, op, [[op.token]]])
+                expect_operand = True
+            loc = end
+
+        self._reduce(stack, operands, -1)
+        if depth or len(operands) != 1 or stack:
+            raise ParseException(s, loc, "Unbalanced parentheses or expression syntax error")
+        return operands[0], loc
+
+    def _find_open_ternary(self, stack, s, loc):
+        """Returns the ternary operator waiting for its second symbol if it is written at `loc`."""
+        for item in reversed(stack):
+            if item[0] == _LPAR:
+                return None
+            if item[0] == _TERNARY_OPEN and s.startswith(item[2].op2, loc):
+                return item
+        return None
+
+    def _reduce(self, stack, operands, min_prec):
+        """Applies the operators of the stack with a precedence higher than `min_prec`."""
+        while stack:
+            top = stack[-1]
+            if top[0] in (_LPAR, _TERNARY_OPEN) or top[1] <= min_prec:
+                break
+            self._apply(stack.pop(), operands)
+
+    def _apply(self, item, operands):
+        kind, _, op, tokens = item
+        if kind == _PREFIX:
+            node_tokens = [tokens, operands.pop()]
+        elif kind == _POSTFIX:
+            node_tokens = [operands.pop(), *tokens]
+        elif kind == _TERNARY:
+            count = 2 * len(tokens) + 1
+            args = operands[-count:]
+            del operands[-count:]
+            node_tokens = [args[0]]
+            for i, (op1, op2) in enumerate(tokens):
+                node_tokens += [op1, args[2 * i + 1], op2, args[2 * i + 2]]
+        else:
+            count = len(tokens) + 1
+            args = operands[-count:]
+            del operands[-count:]
+            node_tokens = [args[0]]
+            for token, arg in zip(tokens, args[1:]):
+                node_tokens += [token, arg]
+        operands.append(op.node_class([node_tokens]))
+
+    def _match_operator(self, s, loc, operators):
+        """Returns the operator of `operators` written at `loc` and the position after it, or `(None, loc)`."""
+        for op in operators.get(s[loc:loc + 1], ()):
+            end = loc
+            for i, word in enumerate(op.words):
+                if i:
+                    end = self.whitespace.match(s, end).end()
+                end = self._match_keyword(s, end, word) if op.keyword else (end + len(word) if s.startswith(word, end) else -1)
+                if end < 0:
+                    break
+            else:
+                return op, end
+        return None, loc
+
+    def _match_keyword(self, s, loc, keyword):
+        """Returns the position after `keyword` if it is written at `loc` as a whole word, -1 otherwise."""
+        end = loc + len(keyword)
+        if (
+            s.startswith(keyword, loc)
+            and (loc == 0 or s[loc - 1] not in self.keyword_chars)
+            and (end == len(s) or s[end] not in self.keyword_chars)
+        ):
+            return end
+        return -1
+
+    def _expect(self, s, loc, symbol):
+        """Returns the position after `symbol`, which must follow."""
+        loc = self.whitespace.match(s, loc).end()
+        if not s.startswith(symbol, loc):
+            raise ParseException(s, loc, "Expected {!r}".format(symbol))
+        return loc + len(symbol)
+
+
 def log(x, y=10):
     if math.isclose(y, 2, abs_tol=1e-15):
         return math.log2(x)
@@ -1297,9 +2125,9 @@ class BriskParser(ArithmeticParser):
         self.add_function("hypot", 2, lambda a, b: sum(safe_pow(i, 2) for i in (a, b))**0.5)
         self.add_function("norm", ..., lambda *seq: sum(safe_pow(i, 2) for i in seq)**0.5)
         self.add_function("dist", 2, dist)
-        self.add_function("rnd", 0, random.random)
-        self.add_function("random", 0, random.random)
-        self.add_function("randint", 2, random.randint)
+        self.add_function("rnd", 0, random.random, pure=False)
+        self.add_function("random", 0, random.random, pure=False)
+        self.add_function("randint", 2, random.randint, pure=False)
         self.add_function("sign", 1, lambda x: 0 if _eq(x, 0, self.epsilon) else 1 if x > 0 else -1),
         self.add_operator("°", 1, ArithmeticParser.LEFT, math.radians)
         # avoid clash with '!=' operator
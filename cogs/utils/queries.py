@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+__all__ = (
+    "Schema",
+    "Queries",
+    "catalog_queries"
+)
+
+
+class Schema:
+    """Tables created by the bot on startup if they do not exist yet."""
+
+    Ledger = """
+        CREATE TABLE IF NOT EXISTS ledger(
+            id bigserial PRIMARY KEY,
+            user_id bigint NOT NULL,
+            amount bigint NOT NULL,
+            balance bigint NOT NULL,
+            reason text,
+            created_at timestamp NOT NULL
+        )
+        """
+
+
+class Queries:
+    """Parameterized queries run by the bot. They are prepared once on every connection of the pool."""
+
+    # Users
+    GetUserState = """
+        SELECT (SELECT users FROM users WHERE id = $1) AS user, (SELECT privacysettings FROM privacysettings WHERE user_id = $1) AS privacy
+        """
+    AddUser = """
+        INSERT INTO users(id, money, level, xp, commands, detective, codebreaker, rps, coinflipping, mentalist, mathdestroy, cats, dogs, roll)
+        VALUES($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+        """
+    DeleteUser = "DELETE FROM users WHERE id = $1"
+    AddMoney = """
+        INSERT INTO users(id, money, level, xp, commands, detective, codebreaker, rps, coinflipping, mentalist, mathdestroy, cats, dogs, roll)
+        VALUES($1, $2, 0, 0, 0, false, false, 0, 0, false, false, 0, 0, false)
+        ON CONFLICT (id) DO UPDATE SET money = users.money + EXCLUDED.money
+        RETURNING money
+        """
+    RemoveMoney = "UPDATE users SET money = money - $2 WHERE id = $1 AND money >= $2 RETURNING money + $2"
+    ResetMoney = "UPDATE users SET money = 0 FROM users AS previous WHERE users.id = $1 AND previous.id = $1 RETURNING previous.money"
+    AddCommands = """
+        INSERT INTO users(id, money, level, xp, commands, detective, codebreaker, rps, coinflipping, mentalist, mathdestroy, cats, dogs, roll)
+        SELECT u.id, 0, 0, 0, u.count, false, false, 0, 0, false, false, 0, 0, false FROM unnest($1::bigint[], $2::bigint[]) AS u(id, count)
+        ON CONFLICT (id) DO UPDATE SET commands = users.commands + EXCLUDED.commands
+        RETURNING id, commands
+        """
+    GetBalances = "SELECT id, money FROM users"
+    GetLeaderboard = """
+        SELECT users.id, users.money, RANK() OVER (ORDER BY users.money DESC) AS rank, COALESCE(privacysettings.balance, true) AS public
+        FROM users LEFT JOIN privacysettings ON privacysettings.user_id = users.id
+        ORDER BY users.money DESC, users.id LIMIT 100
+        """
+
+    # Privacy settings
+    GetPrivacySettings = "SELECT * FROM privacysettings WHERE user_id = $1"
+    InsertPrivacySettings = "INSERT INTO privacysettings(user_id, balance, achievements) VALUES ($1, $2, $3)"
+    UpdatePrivacySettings = "UPDATE privacysettings SET balance = $2, achievements = $3 WHERE user_id = $1"
+    DeletePrivacySettings = "DELETE FROM privacysettings WHERE user_id = $1"
+
+    # Prefixes
+    GetPrefix = "SELECT prefix FROM prefixes WHERE server_id = $1"
+    InsertPrefix = "INSERT INTO prefixes(server_id, prefix) VALUES ($1, $2)"
+    UpdatePrefix = "UPDATE prefixes SET prefix = $2 WHERE server_id = $1"
+    DeletePrefix = "DELETE FROM prefixes WHERE server_id = $1"
+
+    # Logs
+    GetLogChannel = "SELECT channel_id FROM logs WHERE server_id = $1"
+    InsertLogChannel = "INSERT INTO logs(server_id, channel_id) VALUES ($1, $2)"
+    UpdateLogChannel = "UPDATE logs SET channel_id = $2 WHERE server_id = $1"
+    DeleteLogChannel = "DELETE FROM logs WHERE server_id = $1"
+
+    # Autoroles
+    GetAutoroles = "SELECT * FROM autoroles"
+    GetAutorole = "SELECT * FROM autoroles WHERE message_id = $1"
+    GetGuildAutoroles = "SELECT message_id, roles_id FROM autoroles WHERE server_id = $1"
+    InsertAutorole = "INSERT INTO autoroles VALUES ($1, $2, $3, $4, $5, $6::boolean[], $7::boolean[], $8::boolean[])"
+    UpdateAutorole = """
+        UPDATE autoroles SET roles_id = $2, emojis = $3, restrictions = $4, locks = $5::boolean[], inverses = $6::boolean[], msgs_sent = $7::boolean[]
+        WHERE message_id = $1
+        """
+    DeleteAutorole = "DELETE FROM autoroles WHERE message_id = $1"
+
+    # Blacklists and premium servers
+    GetBlacklistedUsers = "SELECT user_id FROM blacklistedusers"
+    GetBlacklistedServers = "SELECT server_id FROM blacklistedservers"
+    GetPremiumServers = "SELECT server_id FROM premiumservers"
+    InsertBlacklistedUser = "INSERT INTO blacklistedusers(user_id) VALUES ($1)"
+    InsertBlacklistedServer = "INSERT INTO blacklistedservers(server_id) VALUES ($1)"
+    InsertPremiumServer = "INSERT INTO premiumservers(server_id, donator_id) VALUES ($1, $2)"
+    DeletePremiumServer = "DELETE FROM premiumservers WHERE server_id = $1"
+
+
+def catalog_queries():
+    """Returns every query of the `Queries` catalog."""
+    return tuple(value for name, value in vars(Queries).items() if not name.startswith("_"))
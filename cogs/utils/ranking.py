@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+
+__all__ = (
+    "MILLIONAIRE",
+    "RankIndex"
+)
+
+
+MILLIONAIRE = 1000000 # Balance from which a player is a millionaire
+
+
+class RankIndex:
+    """Ordered index of the balances of the players, used to find the rank of a player in logarithmic time.
+    Keys `(-money, user_id)` are kept in sorted buckets of at most `2 * load` keys, with a Fenwick tree of the bucket sizes.
+    The sum of the balances, the number of ranked players and the number of millionaires are kept up to date as well."""
+
+    def __init__(self, load=500):
+        self.load = load
+        self._balances = {} # User ID -> balance
+        self._buckets = [] # Sorted lists of keys, each key greater than the keys of the previous buckets
+        self._maxes = [] # Greatest key of each bucket
+        self._tree = [] # Fenwick tree of the bucket sizes
+        self.total = 0 # Sum of the balances
+        self.ranked = 0 # Number of players with money, the others are not ranked
+        self.millionaires = 0 # Number of players with at least `MILLIONAIRE`
+        self._recorders = [] # Dicts of user ID -> balance, `None` if removed, see `recording`
+
+    @contextmanager
+    def recording(self):
+        """Yields a dict recording the balances updated or removed in the block, to pass to `build` with a snapshot taken in the block."""
+        changes = {}
+        self._recorders.append(changes)
+        try:
+            yield changes
+        finally:
+            self._recorders.remove(changes)
+
+    def build(self, balances, changes=None):
+        """Replaces the content of the index with `balances`, an iterable of `(user_id, money)` pairs.
+        `changes`, recorded by `recording` while the balances were fetched, are applied over them as they may be more recent."""
+        self._balances = dict(balances)
+        self.total = sum(self._balances.values())
+        self.ranked = sum(1 for money in self._balances.values() if money > 0)
+        self.millionaires = sum(1 for money in self._balances.values() if money >= MILLIONAIRE)
+        keys = sorted((-money, user_id) for user_id, money in self._balances.items())
+        self._buckets = [keys[i:i+self.load] for i in range(0, len(keys), self.load)]
+        self._rebuild()
+        for user_id, money in (changes or {}).items():
+            if money is None:
+                self.remove(user_id)
+            else:
+                self.update(user_id, money)
+
+    def update(self, user_id, money):
+        """Sets the balance of a user."""
+        for changes in self._recorders:
+            changes[user_id] = money
+        previous = self._balances.get(user_id)
+        if previous == money:
+            return
+        if previous is not None:
+            self._remove_key((-previous, user_id))
+            self._count(previous, -1)
+        self._balances[user_id] = money
+        self._insert_key((-money, user_id))
+        self._count(money, 1)
+
+    def remove(self, user_id):
+        """Removes a user from the index."""
+        for changes in self._recorders:
+            changes[user_id] = None
+        previous = self._balances.pop(user_id, None)
+        if previous is not None:
+            self._remove_key((-previous, user_id))
+            self._count(previous, -1)
+
+    def get(self, user_id):
+        """Returns the balance of a user, or `None` if the user is not in the index."""
+        return self._balances.get(user_id)
+
+    def rank(self, user_id):
+        """Returns the rank of a user, players with the same balance sharing the same rank, or `None` if the user is not in the index."""
+        money = self._balances.get(user_id)
+        if money is None:
+            return None
+        # `(-money,)` is lower than every key with this balance, so this counts the players with a greater balance
+        return self._count_lower((-money,)) + 1
+
+    def __len__(self):
+        return len(self._balances)
+
+    def __contains__(self, user_id):
+        return user_id in self._balances
+
+    def _count(self, money, sign):
+        """Adds (`sign` = 1) or removes (`sign` = -1) a balance from the aggregates."""
+        self.total += sign * money
+        if money > 0:
+            self.ranked += sign
+        if money >= MILLIONAIRE:
+            self.millionaires += sign
+
+    def _count_lower(self, key):
+        """Returns the number of keys lower than `key`."""
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return len(self._balances)
+        return self._prefix(index) + bisect_left(self._buckets[index], key)
+
+    def _insert_key(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._rebuild()
+            return
+        index = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        bucket = self._buckets[index]
+        insort(bucket, key)
+        self._maxes[index] = bucket[-1]
+        if len(bucket) > 2 * self.load:
+            self._buckets[index:index+1] = [bucket[:self.load], bucket[self.load:]]
+            self._rebuild()
+        else:
+            self._add(index, 1)
+
+    def _remove_key(self, key):
+        index = bisect_left(self._maxes, key)
+        bucket = self._buckets[index]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[index] = bucket[-1]
+            self._add(index, -1)
+        else:
+            del self._buckets[index]
+            self._rebuild()
+
+    def _rebuild(self):
+        """Rebuilds the bucket maxima and the Fenwick tree after buckets were added or removed."""
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._tree = [len(bucket) for bucket in self._buckets]
+        for i in range(len(self._tree)):
+            parent = i | (i + 1)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def _add(self, index, delta):
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index |= index + 1
+
+    def _prefix(self, index):
+        """Returns the number of keys in the buckets before `index`."""
+        total = 0
+        while index > 0:
+            total += self._tree[index - 1]
+            index &= index - 1
+        return total
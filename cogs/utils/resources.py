@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+from types import MappingProxyType
+from .data import Files
+
+__all__ = (
+    "Resource",
+    "resources"
+)
+
+
+def freeze(value):
+    """Returns an immutable copy of a parsed JSON value."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Resource:
+    """JSON resource file, parsed once into immutable structures and parsed again only when the file is modified.
+    The modification time is checked at most once every `check_interval` seconds."""
+
+    def __init__(self, path, check_interval=10.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._data = None
+        self._mtime = None
+        self._next_check = 0.0
+
+    def get(self):
+        """Returns the parsed content of the file."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != self._mtime:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._data = freeze(json.load(f))
+                    self._mtime = mtime
+            except (OSError, ValueError):
+                # The file is missing or being rewritten: the last parsed content is kept until it can be parsed again
+                if self._data is None:
+                    raise
+        return self._data
+
+
+class ResourceCatalog:
+    """Catalog of the JSON resource files used by the bot."""
+
+    def __init__(self):
+        self._achievements = Resource(Files.Achievements)
+        self._jokes = Resource(Files.Jokes)
+
+    @property
+    def achievements(self):
+        """Mapping of achievement names to their `revealed`, `hidden` and `reward` values."""
+        return self._achievements.get()
+
+    @property
+    def jokes(self):
+        """Tuple of jokes, indexed by joke number minus one."""
+        return self._jokes.get()
+
+
+resources = ResourceCatalog()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+from collections import namedtuple
+
+__all__ = (
+    "UserState",
+)
+
+
+class UserState(namedtuple("UserState", ("user", "privacy"))):
+    """Database state of a user: their `users` row and their `privacysettings` row, each `None` if the user has none."""
+
+    __slots__ = ()
+
+    @property
+    def money(self):
+        """Balance of the user."""
+        return 0 if self.user is None else self.user["money"]
+
+    @property
+    def public_balance(self):
+        """Whether other users can see the balance of the user."""
+        return self.privacy is None or self.privacy["balance"]
+
+    @property
+    def public_achievements(self):
+        """Whether other users can see the achievements of the user."""
+        return self.privacy is None or self.privacy["achievements"]
@@ -0,0 +1,49 @@
+"""Benchmarks of the expression parser, run with `python tests/benchmark_parser.py`."""
+
+from functools import partial
+import timeit
+
+from test_parser import engine_corpus, parser
+
+
+def benchmark_compiled():
+    """Compares walking the parsed trees with calling their compiled functions."""
+    brisk_parser = parser.BriskParser(5)
+    with brisk_parser.session():
+        brisk_parser.evaluate("r = 3")
+        brisk_parser.evaluate("area @= pi * r^2")
+        for expr in (
+            "1 + 2 * 3 - 4 / 5",
+            "(2^10 + sqrt(16)) * sin(pi / 4) + log(1000, 10)",
+            "r * (r + 1) * (r + 2) / 6",
+            "area * 2 + r >= 10 ? area : -area",
+            "{1, 2, 3} ∪ {r, 4}",
+        ):
+            tree = brisk_parser.parse_cached(expr)
+            walked = timeit.timeit(tree.evaluate, number=10000)
+            compiled = timeit.timeit(tree.compiled(), number=10000)
+            print("{:50} walked {:7.2f} µs, compiled {:7.2f} µs, {:5.1f}x".format(
+                expr, walked * 100, compiled * 100, walked / compiled
+            ))
+
+
+def parse_all(brisk_parser, expressions):
+    for expr in expressions:
+        try:
+            brisk_parser.parse(expr)
+        except Exception:
+            pass
+
+
+def benchmark_engines():
+    """Compares the parsing time of both engines, without the cache, syntax errors included."""
+    for engine in parser.ArithmeticParser.engines:
+        brisk_parser = parser.BriskParser(5, engine=engine)
+        with brisk_parser.session():
+            elapsed = timeit.timeit(partial(parse_all, brisk_parser, engine_corpus), number=3)
+        print("{:10} engine: {:7.2f} µs per expression".format(engine, elapsed / (3 * len(engine_corpus)) * 1e6))
+
+
+if __name__ == "__main__":
+    benchmark_compiled()
+    benchmark_engines()
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("discord", "asyncpg", "discord_slash", "discord_components"):
+    pytest.importorskip(module)
+
+import discord
+from cogs.utils import delivery
+
+
+class FakeChannel:
+    """Log channel in which the bot cannot manage webhooks."""
+
+    def __init__(self):
+        self.id = 1
+        self.guild = SimpleNamespace(id=2, me=None)
+        self.sent = [] # Embeds of each message sent
+        self.permission_checks = 0
+
+    def permissions_for(self, member):
+        self.permission_checks += 1
+        return SimpleNamespace(manage_webhooks=False)
+
+    async def send(self, embed=None):
+        self.sent.append([embed])
+
+
+def test_fallback_sends_at_most_max_messages_per_batch(monkeypatch):
+    channel = FakeChannel()
+    dispatcher = delivery.LogDispatcher(SimpleNamespace(logger=logging.getLogger("test")), delay=0, max_messages=2, webhook_retry=0)
+    batches = [] # Number of messages sent before each batch
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        batches.append(len(channel.sent))
+        await real_sleep(0)
+
+    async def deliver():
+        for i in range(25):
+            dispatcher.post(channel, discord.Embed(description=str(i)))
+        while dispatcher._tasks:
+            await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    asyncio.run(deliver())
+
+    assert [embeds[0].description for embeds in channel.sent] == [str(i) for i in range(25)]
+    assert all(len(embeds) == 1 for embeds in channel.sent)
+    assert all(later - earlier <= 2 for earlier, later in zip(batches, batches[1:] + [len(channel.sent)]))
+    # The webhook permission is checked again once `webhook_retry` seconds have passed
+    assert channel.permission_checks > 1
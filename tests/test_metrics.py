@@ -0,0 +1,33 @@
+import importlib.util
+import os
+
+import pytest
+
+# Loaded from its file, as importing the `cogs` package needs the bot dependencies
+_spec = importlib.util.spec_from_file_location(
+    "brisk_metrics", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cogs", "utils", "metrics.py")
+)
+metrics = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(metrics)
+
+
+def test_assert_max_queries_within_budget():
+    with metrics.assert_max_queries(2) as stats:
+        metrics.count_query(0.5)
+        with metrics.timed_query():
+            pass
+    assert stats.queries == 2
+
+
+def test_assert_max_queries_over_budget():
+    with pytest.raises(AssertionError, match="3 queries were run, expected at most 2"):
+        with metrics.assert_max_queries(2):
+            for _ in range(3):
+                metrics.count_query(0.0)
+
+
+def test_queries_are_not_counted_outside_of_a_command():
+    metrics.count_query(0.1)
+    with metrics.track_queries() as stats:
+        pass
+    assert stats.queries == 0
@@ -0,0 +1,202 @@
+import gc
+import importlib.util
+import os
+import random
+import weakref
+
+import pytest
+
+# Loaded from its file, as importing the `cogs` package needs the bot dependencies
+_spec = importlib.util.spec_from_file_location(
+    "brisk_parser", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cogs", "utils", "parser.py")
+)
+parser = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(parser)
+
+
+@pytest.fixture
+def brisk_parser():
+    return parser.BriskParser(5)
+
+
+def test_parse_then_evaluate_without_session(brisk_parser):
+    brisk_parser.parse("x = 3")
+    brisk_parser.parse("f @= x + 1")
+    assert brisk_parser.parse("x * 2").evaluate() == 6
+    assert brisk_parser.parse("f * 2").compiled()() == 8
+
+
+def test_grammar_methods_without_session(brisk_parser):
+    brisk_parser.parseString("x = 7")
+    assert brisk_parser.vars()["x"] == 7
+    assert brisk_parser.parseString("x + 1")[0].evaluate() == 8
+    assert [(tokens[0].evaluate(), start, end) for tokens, start, end in brisk_parser.scanString("x+1 ; 2*x")] == [(8, 0, 4), (14, 6, 9)]
+
+
+def test_sessions_are_separate():
+    first, second = parser.BriskParser(5), parser.BriskParser(5)
+    first.evaluate("x = 1")
+    second.evaluate("x = 2")
+    tree = first.parse("x")
+    assert tree.evaluate() == 1
+    with second.session():
+        assert tree.evaluate() == 2
+
+
+def _describe(function):
+    try:
+        return repr(function())
+    except Exception as e:
+        return type(e).__name__
+
+
+def _outcome(brisk_parser, expr):
+    """Returns the tree, the value or the errors of an expression, with the variables `r` and `area` defined."""
+    try:
+        with brisk_parser.session():
+            brisk_parser.evaluate("r = 3")
+            brisk_parser.evaluate("area @= pi * r^2")
+            random.seed(0)
+            tree = brisk_parser.parse(expr, parseAll=True)
+            return _describe(tree.__repr__), _describe(tree.evaluate), repr(sorted(brisk_parser.vars().items(), key=str))
+    except Exception as e:
+        return type(e).__name__, type(e.__cause__).__name__
+
+
+def _random_expression(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice(["1", "2.5", "1e3", "r", "area", "pi", "True", "'a'", "{1, r}", "x"])
+    choice = rng.random()
+    if choice < 0.15:
+        return rng.choice(["-", "+", "not ", "√"]) + _random_expression(rng, depth - 1)
+    if choice < 0.25:
+        return _random_expression(rng, depth - 1) + rng.choice(["!", "%", "²", "°"])
+    if choice < 0.35:
+        return "{}({})".format(rng.choice(["sin", "max", "round", "abs", "rnd"]), _random_expression(rng, depth - 1))
+    if choice < 0.45:
+        return "{} ? {} : {}".format(*(_random_expression(rng, depth - 1) for _ in range(3)))
+    if choice < 0.5:
+        return "{} in [{}, {})".format(*(_random_expression(rng, depth - 1) for _ in range(3)))
+    if choice < 0.6:
+        return "(" + _random_expression(rng, depth - 1) + ")"
+    return "{} {} {}".format(
+        _random_expression(rng, depth - 1),
+        rng.choice(["+", "-", "*", "/", "//", "mod", "^", "<", "==", "!=", "and", "or", "∪", "∩", "in"]),
+        _random_expression(rng, depth - 1)
+    )
+
+
+def _random_statement(rng):
+    lhs = rng.choice(["a", "b", "x", "a, b", "pi", "ANS", "not", "z₁"])
+    if rng.random() < 0.5:
+        return "{} {} {}".format(lhs, rng.choice(["=", "<-", "←"]), _random_expression(rng, 2))
+    return "{} @= {}".format(lhs, _random_expression(rng, 2))
+
+
+_rng = random.Random(0)
+engine_corpus = (
+    [_random_expression(_rng, 4) for _ in range(1000)]
+    + [_random_statement(_rng) for _ in range(200)]
+    + [
+        "1 +", "(1", "f(", "1 in 5", "x in 5", "notx", "1 inter 2", "2 != 3!", "1 < 2 < 3", "a ? b ? c : d : e",
+        "x = 1, 2", "a, b = 1, 2", "area @= area", "VARS", "CLEAR", "|-3| + ⌊2.5⌋ + ⌈2.5⌉ + ⌊2.5⌉", "'a' * 3",
+    ]
+)
+
+
+def test_engines_agree():
+    parsers = parser.BriskParser(5), parser.BriskParser(5, engine="precedence")
+    mismatches = [expr for expr in engine_corpus if _outcome(parsers[0], expr) != _outcome(parsers[1], expr)]
+    assert mismatches == []
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        parser.BriskParser(5, engine="unknown")
+
+
+compiled_corpus = [
+    "1 + 2 * 3 - 4 / 5", "(2^10 + sqrt(16)) * sin(pi / 4) + log(1000, 10)", "r * (r + 1) * (r + 2) / 6",
+    "area * 2 + r >= 10 ? area : -area", "{1, 2, 3} ∪ {r, 4}", "r in [1, 5)", "not r == 3 and 1 or 0", "5! + 3² - 50%",
+    "max(r, 2, area) // 2", "|-r| + ⌊2.5⌋ + ⌈2.5⌉", "'ab' * r", "1 / 0", "r ^ 1e6",
+]
+
+
+@pytest.mark.parametrize("expr", compiled_corpus)
+def test_compiled_matches_evaluate(brisk_parser, expr):
+    with brisk_parser.session():
+        brisk_parser.evaluate("r = 3")
+        brisk_parser.evaluate("area @= pi * r^2")
+        tree = brisk_parser.parse(expr, parseAll=True)
+        assert _describe(tree.compiled()) == _describe(tree.evaluate)
+        # Calling the compiled function again, once constants are folded, gives the same result
+        assert _describe(tree.compiled()) == _describe(tree.evaluate)
+
+
+def test_constants_are_folded(brisk_parser):
+    with brisk_parser.session():
+        tree = brisk_parser.parse("2^10 + sqrt(16) * 3", parseAll=True)
+        assert tree._result[0].is_constant()
+        assert tree.compiled()() == tree.evaluate() == 1036
+
+
+def test_variables_are_not_folded(brisk_parser):
+    with brisk_parser.session():
+        brisk_parser.evaluate("r = 3")
+        brisk_parser.evaluate("area @= r * 2")
+        tree = brisk_parser.parse("area + r", parseAll=True)
+        assert not tree._result[0].is_constant()
+        assert tree.compiled()() == 9
+        brisk_parser.evaluate("r = 4")
+        assert tree.compiled()() == tree.evaluate() == 12
+
+
+def test_impure_functions_are_not_folded(brisk_parser):
+    with brisk_parser.session():
+        tree = brisk_parser.parse("rnd() + randint(1, 10^9)", parseAll=True)
+        assert not tree._result[0].is_constant()
+        values = {tree.compiled()() for _ in range(5)}
+        assert len(values) > 1
+    assert brisk_parser.evaluate("rnd()") != brisk_parser.evaluate("rnd()")
+
+
+def test_assignments_are_not_folded(brisk_parser):
+    brisk_parser.evaluate("n = 0")
+    for _ in range(3):
+        brisk_parser.evaluate("n = n + 1")
+    assert brisk_parser.vars()["n"] == 3
+    assert brisk_parser.evaluate("n * 2") == 6
+    brisk_parser.evaluate("n = 10")
+    assert brisk_parser.evaluate("n * 2") == 20
+
+
+def _collect():
+    # The packrat cache of pyparsing holds the exceptions of the last parse, with the frames of their tracebacks, until the next parse
+    parser.pp.ParserElement.reset_cache()
+    gc.collect()
+
+
+def test_cached_trees_do_not_keep_sessions():
+    first = parser.BriskParser(5)
+    first.evaluate("secret = 42")
+    tree = first.parse_cached("secret + 1")
+    alive = weakref.ref(first)
+    del first
+    _collect()
+    assert alive() is None
+
+    second = parser.BriskParser(5)
+    assert second.parse_cached("secret + 1") is tree
+    with pytest.raises(LookupError):
+        tree.evaluate()
+    with pytest.raises(NameError):
+        second.evaluate("secret + 1")
+
+
+def test_parsed_trees_do_not_keep_sessions():
+    brisk_parser = parser.BriskParser(5)
+    tree = brisk_parser.parse("x = 3")
+    alive = weakref.ref(brisk_parser)
+    del brisk_parser
+    _collect()
+    assert alive() is None
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+
+# Loaded from its file, as importing the `cogs` package needs the bot dependencies
+_spec = importlib.util.spec_from_file_location(
+    "brisk_ranking", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cogs", "utils", "ranking.py")
+)
+ranking = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ranking)
+
+
+def test_rebuild_keeps_updates_made_during_the_fetch():
+    ranks = ranking.RankIndex(load=2)
+    ranks.build([(1, 10), (2, 20), (3, 30)])
+    with ranks.recording() as changes:
+        snapshot = [(1, 10), (2, 20), (3, 30), (4, 40)] # Taken before the updates below
+        ranks.update(1, 2000000)
+        ranks.remove(3)
+    ranks.build(snapshot, changes)
+
+    assert (ranks.get(1), ranks.get(2), ranks.get(3), ranks.get(4)) == (2000000, 20, None, 40)
+    assert [ranks.rank(user_id) for user_id in (1, 4, 2)] == [1, 2, 3]
+    assert (len(ranks), ranks.total, ranks.millionaires) == (3, 2000060, 1)
+
+
+def test_players_without_money_are_not_ranked():
+    ranks = ranking.RankIndex()
+    ranks.build([(1, 0), (2, 20), (3, 30)])
+    assert (len(ranks), ranks.ranked) == (3, 2)
+    ranks.update(1, 5)
+    ranks.update(2, 0)
+    ranks.remove(3)
+    ranks.update(4, 0)
+    assert (len(ranks), ranks.ranked) == (3, 1)
+
+
+def test_updates_are_not_recorded_outside_of_a_rebuild():
+    ranks = ranking.RankIndex()
+    ranks.build([(1, 10)])
+    with ranks.recording():
+        pass
+    ranks.update(1, 50)
+    ranks.build([(1, 10)])
+    assert ranks.get(1) == 10
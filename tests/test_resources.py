@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+for module in ("discord", "asyncpg", "discord_slash", "discord_components"):
+    pytest.importorskip(module)
+
+from cogs.utils import Resource
+
+
+def test_last_content_is_kept_when_the_file_is_missing(tmp_path):
+    path = tmp_path / "jokes.json"
+    path.write_text(json.dumps(["a joke"]), encoding="utf-8")
+    resource = Resource(str(path), check_interval=0)
+    assert resource.get() == ("a joke",)
+
+    os.remove(path)
+    assert resource.get() == ("a joke",)
+
+    path.write_text("[", encoding="utf-8") # Being written
+    assert resource.get() == ("a joke",)
+
+    path.write_text(json.dumps(["another joke"]), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert resource.get() == ("another joke",)
+
+
+def test_missing_file_raises_before_any_content_is_parsed(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        Resource(str(tmp_path / "missing.json")).get()
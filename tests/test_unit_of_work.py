@@ -0,0 +1,117 @@
+import asyncio
+import builtins
+import io
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+for module in ("discord", "asyncpg", "discord_slash", "discord_components"):
+    pytest.importorskip(module)
+
+
+@pytest.fixture(scope="module")
+def brisk():
+    # The tokens are read when the module is imported
+    real_open = builtins.open
+    def fake_open(file, *args, **kwargs):
+        if file in ("./resources/token.txt", "./resources/dbtoken.txt"):
+            return io.StringIO("token")
+        return real_open(file, *args, **kwargs)
+    builtins.open = fake_open
+    try:
+        import brisk
+    finally:
+        builtins.open = real_open
+    return brisk
+
+
+class SlottedProxy:
+    """Stands for asyncpg's `PoolConnectionProxy`, which has no `__dict__`: setting an attribute on it fails."""
+
+    __slots__ = ("balances",)
+
+    def __init__(self, balances):
+        self.balances = balances
+
+    @asynccontextmanager
+    async def transaction(self):
+        snapshot = dict(self.balances)
+        try:
+            yield
+        except:
+            self.balances.clear()
+            self.balances.update(snapshot)
+            raise
+
+    async def fetchval(self, query, user_id, amount):
+        from cogs.utils import Queries
+        money = self.balances.get(user_id, 0)
+        if query == Queries.AddMoney:
+            self.balances[user_id] = money + amount
+            return money + amount
+        if query == Queries.RemoveMoney:
+            if money < amount:
+                return None
+            self.balances[user_id] = money - amount
+            return money
+        raise AssertionError("Unexpected query")
+
+
+class FakePool:
+    def __init__(self, balances):
+        self.proxy = SlottedProxy(balances)
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.proxy
+
+
+def make_bot(brisk, balances):
+    from cogs.utils import RankIndex
+    bot = brisk.Bot.__new__(brisk.Bot)
+    bot.conn_pool = FakePool(balances)
+    bot.ranks = RankIndex()
+    bot.ranks.build(balances.items())
+    bot.pending_ledger = []
+    return bot
+
+
+def test_proxy_is_slotted():
+    with pytest.raises(AttributeError):
+        SlottedProxy({}).balance_changes = []
+
+
+def test_transfermoney(brisk):
+    balances = {1: 100, 2: 5}
+    bot = make_bot(brisk, balances)
+    sender, receiver = SimpleNamespace(id=1), SimpleNamespace(id=2)
+
+    asyncio.run(bot.transfermoney(sender, receiver, 30, tax=10))
+
+    assert balances == {1: 60, 2: 35}
+    assert (bot.ranks.get(1), bot.ranks.get(2)) == (60, 35)
+    assert [entry[:4] for entry in bot.pending_ledger] == [(1, -30, 70, "give"), (1, -10, 60, "tax"), (2, 30, 35, "give")]
+
+
+def test_transfermoney_rolled_back(brisk):
+    balances = {1: 100, 2: 5}
+    bot = make_bot(brisk, balances)
+    sender, receiver = SimpleNamespace(id=1), SimpleNamespace(id=2)
+
+    with pytest.raises(ValueError):
+        asyncio.run(bot.transfermoney(sender, receiver, 95, tax=10))
+
+    assert balances == {1: 100, 2: 5}
+    assert (bot.ranks.get(1), bot.ranks.get(2)) == (100, 5)
+    assert bot.pending_ledger == []
+
+
+def test_transfermoney_query_budget(brisk):
+    from cogs.utils import assert_max_queries
+    bot = make_bot(brisk, {1: 100, 2: 5})
+
+    with assert_max_queries(3) as stats:
+        asyncio.run(bot.transfermoney(SimpleNamespace(id=1), SimpleNamespace(id=2), 30, tax=10))
+
+    assert stats.queries == 3